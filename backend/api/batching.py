@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+from worker_pool import InferenceUnavailable
+
+
+def length_buckets(lengths, max_tokens=8192, max_batch_size=64):
+    """
+    Group item indices into sub-batches of similar token length.
+
+    Items are sorted by length and packed greedily so that each sub-batch,
+    once padded to its longest member, stays within `max_tokens`. Returns a
+    list of index lists; callers scatter results back using those indices.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+
+    buckets = []
+    current = []
+    for i in order:
+        # Sorted ascending, so the padded width of the bucket is this item's length
+        padded_tokens = (len(current) + 1) * max(lengths[i], 1)
+        if current and (padded_tokens > max_tokens or len(current) >= max_batch_size):
+            buckets.append(current)
+            current = []
+        current.append(i)
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-text classification calls into one forward pass.
+
+    Callers submit texts and block on the returned futures. A background thread
+    waits up to `max_wait_ms` for more texts to arrive (or until `max_batch_size`
+    texts are queued), runs `predict_fn` once on the whole batch and fans the
+    results back out to each waiting caller.
+
+    With `consumers` > 1, that many threads collect and run batches
+    concurrently, so a `predict_fn` backed by several worker processes keeps
+    every worker busy instead of running one batch at a time.
+
+    Texts submitted after `stop()` run inline. Anything still queued once the
+    threads have exited (or timed out) fails with InferenceUnavailable, so no
+    caller waits on a future that will never resolve.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5, consumers=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.consumers = max(1, consumers)
+        self._queue = Queue()
+        self._threads = []
+        self._running = False
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.batches_run = 0
+        self.items_processed = 0
+        self.max_queue_depth = 0
+        self.batch_size_counts = Counter()
+
+    def start(self):
+        """Start the background batching threads"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [
+                threading.Thread(target=self._run, name=f"micro-batcher-{i}", daemon=True)
+                for i in range(self.consumers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the batching threads after draining queued requests"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            # One sentinel per consumer, behind everything submitted so far
+            for _ in self._threads:
+                self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+
+        # Whatever the threads did not reach before the deadline
+        error = InferenceUnavailable("Classification batcher stopped")
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                break
+            if item is not None:
+                item[1].set_exception(error)
+
+    def submit(self, text):
+        """Queue one text and return a Future resolving to its prediction"""
+        future = Future()
+        # Checked and queued under the lock, so nothing lands behind stop()'s sentinels
+        with self._lock:
+            running = self._running
+            if running:
+                self._queue.put((text, future))
+                self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        if running:
+            return future
+
+        # Batcher not started (e.g. during startup) or stopped - run inline
+        try:
+            future.set_result(self.predict_fn([text])[0])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit_many(self, texts):
+        """Queue several texts so they can share batches with other callers"""
+        return [self.submit(text) for text in texts]
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the wait expires"""
+        item = self._queue.get()
+        if item is None:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the run loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            texts = [text for text, _ in batch]
+            try:
+                results = self.predict_fn(texts)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            with self._lock:
+                self.batches_run += 1
+                self.items_processed += len(batch)
+                self.batch_size_counts[len(batch)] += 1
+
+    def stats(self):
+        """Return queue depth and realized batch size metrics"""
+        with self._lock:
+            avg_batch_size = self.items_processed / self.batches_run if self.batches_run else 0.0
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches_run": self.batches_run,
+                "items_processed": self.items_processed,
+                "avg_batch_size": round(avg_batch_size, 2),
+                "batch_size_histogram": dict(sorted(self.batch_size_counts.items())),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "consumers": self.consumers,
+            }
@@ -0,0 +1,319 @@
+"""
+Replay realistic traffic against the FastAPI app, offline.
+
+Requests are built from posts in unlabelled_data_clean.csv and sent to the
+app in-process over ASGI (no network), with:
+
+    - a stub in place of asyncpraw, answering searches from the same CSV
+    - a throwaway SQLite database in place of MySQL (or --database-url)
+    - the model loaded from a local safetensors directory (--model)
+
+Each inference backend runs in its own process so module-level configuration
+and memory are not shared between runs. For every backend and endpoint it
+reports p50/p95/p99 latency, throughput, error count, resident memory and the
+mean time per pipeline stage (from the API's Prometheus metrics).
+
+Usage:
+    python benchmark_api.py --model ./bias_model --backends torch torch-int8 onnx --output results.json
+    python benchmark_api.py --endpoints classify recommend --requests 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from benchmark_backends import percentile
+
+ENDPOINTS = ("classify", "classify_batch", "related", "recommend")
+STAGES = ("tokenization", "model_forward", "keyword_extraction", "reddit_search", "db_write")
+LEANINGS = ("left", "neutral", "right")
+
+
+# --- TRAFFIC ---
+def load_posts(csv_path, limit):
+    """Posts with title, body and subreddit (taken from the permalink)"""
+    df = pd.read_csv(csv_path, nrows=limit)
+    posts = []
+    for title, body, permalink in zip(df["title"], df["body"], df["permalink"]):
+        title = "" if pd.isna(title) else str(title)
+        body = "" if pd.isna(body) else str(body)
+        permalink = "" if pd.isna(permalink) else str(permalink)
+        if not (title + body).strip():
+            continue
+        subreddit = permalink.split("/")[2] if permalink.startswith("/r/") else "politics"
+        posts.append({"title": title, "body": body, "permalink": permalink, "subreddit": subreddit})
+    return posts
+
+
+def build_requests(endpoint, posts, count, users=20, batch_size=16, seed=0):
+    """
+    Deterministic (path, JSON body) pairs for one endpoint. Recommendation
+    traffic is spread over a small set of users so they cross the bias
+    threshold and exercise the counter-recommendation path.
+    """
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        post = posts[i % len(posts)]
+        text = f"{post['title']} {post['body']}".strip()
+        activity = {
+            "user_id": f"bench-user-{rng.randrange(users)}",
+            "title": post["title"],
+            "post": post["body"],
+            "label": LEANINGS[rng.randrange(len(LEANINGS))],
+            "subreddit": post["subreddit"],
+        }
+        if endpoint == "classify":
+            requests.append(("/classify", {"text": text}))
+        elif endpoint == "classify_batch":
+            batch = [posts[(i * batch_size + j) % len(posts)] for j in range(batch_size)]
+            requests.append(("/classify_batch", {"texts": [f"{p['title']} {p['body']}".strip() for p in batch]}))
+        elif endpoint == "related":
+            requests.append(("/api/related", activity))
+        elif endpoint == "recommend":
+            requests.append(("/api/recommend", activity))
+        else:
+            raise ValueError(f"Unknown endpoint '{endpoint}'")
+    return requests
+
+
+# --- REDDIT STUB ---
+class StubSubreddit:
+    """Answers `search` from the benchmark corpus: posts sharing the most query terms first"""
+
+    def __init__(self, corpus, latency_ms):
+        self.corpus = corpus
+        self.latency = latency_ms / 1000.0
+        self.terms = [set(re.findall(r"\w+", post.title.lower())) for post in corpus]
+
+    async def search(self, query, sort="top", limit=25):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        query_terms = set(query.lower().split())
+        scored = sorted(
+            range(len(self.corpus)),
+            key=lambda i: (-len(query_terms & self.terms[i]), i)
+        )
+        for i in scored[:limit]:
+            # Fresh objects: the API sets `leaning` on each result
+            yield SimpleNamespace(**vars(self.corpus[i]))
+
+
+class StubReddit:
+    """Stand-in for asyncpraw.Reddit with only what the API calls"""
+
+    def __init__(self, posts, latency_ms=0):
+        corpus = [
+            SimpleNamespace(
+                title=post["title"],
+                selftext=post["body"],
+                permalink=post["permalink"],
+                score=100 + i % 900,
+                num_comments=i % 200,
+                subreddit=SimpleNamespace(display_name=post["subreddit"]),
+            )
+            for i, post in enumerate(posts)
+        ]
+        self._subreddit = StubSubreddit(corpus, latency_ms)
+
+    async def subreddit(self, name):
+        return self._subreddit
+
+    async def close(self):
+        pass
+
+
+# --- MEASUREMENT ---
+def memory_mb():
+    """(current, peak) resident set size of this process in MB, from /proc"""
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, amount, _ = line.split()
+                values[key] = int(amount) / 1024.0
+    return round(values.get("VmRSS:", 0.0), 1), round(values.get("VmHWM:", 0.0), 1)
+
+
+def stage_totals():
+    """(count, seconds) recorded so far for each pipeline stage"""
+    from prometheus_client import REGISTRY
+
+    totals = {}
+    for stage in STAGES:
+        count = REGISTRY.get_sample_value("api_stage_duration_seconds_count", {"stage": stage}) or 0.0
+        seconds = REGISTRY.get_sample_value("api_stage_duration_seconds_sum", {"stage": stage}) or 0.0
+        totals[stage] = (count, seconds)
+    return totals
+
+
+def stage_summary(before, after):
+    summary = {}
+    for stage in STAGES:
+        count = after[stage][0] - before[stage][0]
+        seconds = after[stage][1] - before[stage][1]
+        if count:
+            summary[stage] = {"calls": int(count), "mean_ms": round(seconds / count * 1000, 3)}
+    return summary
+
+
+async def replay(client, requests, concurrency):
+    """Send requests with at most `concurrency` in flight; return latencies (ms), errors, seconds"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def send(path, body):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(path, body) for path, body in requests))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_backend(args):
+    """Start the app in this process with args.backend and replay every endpoint"""
+    import httpx
+    import combined_api
+
+    posts = load_posts(args.data, args.limit)
+    # Installed before the background warm-up would create a real client
+    combined_api.reddit = StubReddit(posts, latency_ms=args.search_latency_ms)
+    await combined_api.startup_event()
+    await combined_api.startup_task
+    if not combined_api.components.ready():
+        raise RuntimeError(
+            f"API startup failed ({combined_api.components.stats()}); "
+            "check --model points at a safetensors model directory"
+        )
+
+    results = []
+    transport = httpx.ASGITransport(app=combined_api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for endpoint in args.endpoints:
+            requests = build_requests(endpoint, posts, args.warmup + args.requests, seed=args.seed)
+            # Warm-up requests are excluded so lazy initialization doesn't skew the numbers
+            await replay(client, requests[:args.warmup], args.concurrency)
+
+            before = stage_totals()
+            latencies, errors, total = await replay(client, requests[args.warmup:], args.concurrency)
+            rss, peak_rss = memory_mb()
+
+            result = {
+                "backend": args.backend,
+                "endpoint": endpoint,
+                "requests": len(latencies),
+                "concurrency": args.concurrency,
+                "errors": errors,
+                "latency_ms_p50": round(percentile(latencies, 50), 3),
+                "latency_ms_p95": round(percentile(latencies, 95), 3),
+                "latency_ms_p99": round(percentile(latencies, 99), 3),
+                "throughput_rps": round(len(latencies) / total, 2),
+                "rss_mb": rss,
+                "peak_rss_mb": peak_rss,
+                "stages": stage_summary(before, stage_totals()),
+            }
+            results.append(result)
+            print(json.dumps(result, indent=2))
+
+    await combined_api.shutdown_event()
+    return results
+
+
+def child_env(args, backend, database_url):
+    """Environment for one backend run: local model, stand-in database, nothing fetched remotely"""
+    env = dict(os.environ)
+    env.update({
+        "INFERENCE_BACKEND": backend,
+        "MODEL_DIR": args.model,
+        "DATABASE_URL": database_url,
+        "KEYWORD_ENGINE": args.keyword_engine,
+        "KEYWORD_ENCODER": "classifier",
+        "RECOMMEND_SOURCE": "reddit",
+        "CLASSIFY_CACHE_BACKEND": "none",
+        "COUNTER_STORE": "memory",
+        "LOG_LEVEL": "WARNING",
+        # asyncpraw is replaced after startup, but needs credentials to construct
+        "REDDIT_CLIENT_ID": env.get("REDDIT_CLIENT_ID") or "benchmark",
+        "REDDIT_SECRET_ID": env.get("REDDIT_SECRET_ID") or "benchmark",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+    })
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="./bias_model", help="Safetensors model directory")
+    parser.add_argument("--data", default="../database/data/unlabelled_data_clean.csv", help="CSV with title/body/permalink columns")
+    parser.add_argument("--limit", type=int, default=2000, help="CSV rows used for requests and the Reddit stub")
+    parser.add_argument("--backends", nargs="+", default=["torch"], help="Inference backends to compare")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--keyword-engine", default="keybert", choices=["keybert", "lexical"])
+    parser.add_argument("--search-latency-ms", type=float, default=0, help="Simulated Reddit search latency")
+    parser.add_argument("--database-url", help="Use this database instead of a throwaway SQLite file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    # Internal: run a single backend in this process
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        results = asyncio.run(run_backend(args))
+        with open(args.output, "w") as f:
+            json.dump(results, f)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            print(f"\nRunning backend '{backend}'...")
+            database_url = args.database_url or f"sqlite:///{os.path.join(tmp, backend + '.db')}"
+            output = os.path.join(tmp, f"{backend}.json")
+            argv = list(sys.argv[1:])
+            if "--output" in argv:
+                del argv[argv.index("--output"):argv.index("--output") + 2]
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *argv, "--backend", backend, "--output", output],
+                env=child_env(args, backend, database_url),
+                check=True
+            )
+            with open(output) as f:
+                results.extend(json.load(f))
+
+    print(f"\n{'backend':<12} {'endpoint':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'errors':>7} {'rss MB':>8}")
+    for r in results:
+        print(f"{r['backend']:<12} {r['endpoint']:<16} {r['latency_ms_p50']:>9.2f} {r['latency_ms_p95']:>9.2f} "
+              f"{r['latency_ms_p99']:>9.2f} {r['throughput_rps']:>8.2f} {r['errors']:>7} {r['rss_mb']:>8.1f}")
+
+    if args.output:
+        config = {
+            "data": args.data, "limit": args.limit, "requests": args.requests, "warmup": args.warmup,
+            "concurrency": args.concurrency, "keyword_engine": args.keyword_engine,
+            "search_latency_ms": args.search_latency_ms, "seed": args.seed,
+        }
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Compare inference backends against the eager PyTorch model.
+
+Runs every backend over posts from unlabelled_data_clean.csv, reports label
+agreement and probability drift relative to the eager fp32 model, plus
+per-batch latency and throughput, and names the fastest backend that stays
+within tolerance.
+
+Usage:
+    python benchmark_backends.py --limit 1000 --backends torch torch-int8 onnx
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+import torch
+
+from inference import load_backend
+from model_store import load_model_artifact
+
+
+def load_texts(csv_path, limit):
+    df = pd.read_csv(csv_path, nrows=limit)
+    titles = df["title"].fillna("").astype(str)
+    bodies = df["body"].fillna("").astype(str)
+    texts = (titles + " " + bodies).str.strip()
+    return [t for t in texts if t]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_backend(backend, texts, batch_size, max_length):
+    """Return (probabilities, per-batch latencies in ms, total seconds)"""
+    # One untimed batch so lazy allocations don't skew the first measurement
+    backend.predict_proba(texts[:batch_size], max_length=max_length)
+
+    outputs = []
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        batch_start = time.perf_counter()
+        outputs.append(backend.predict_proba(texts[i:i + batch_size], max_length=max_length))
+        latencies.append((time.perf_counter() - batch_start) * 1000)
+    total = time.perf_counter() - start
+    return torch.cat(outputs), latencies, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="./bias_model", help="Safetensors model directory or pickle file")
+    parser.add_argument("--data", default="../database/data/unlabelled_data_clean.csv", help="CSV with title/body columns")
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--onnx-path", default="./bias_model.onnx")
+    parser.add_argument("--limit", type=int, default=1000, help="Number of CSV rows to score")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--tolerance", type=float, default=0.98, help="Minimum label agreement with the eager model")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    texts = load_texts(args.data, args.limit)
+    print(f"Loaded {len(texts)} texts from {args.data}")
+
+    model, tokenizer = load_model_artifact(args.model)
+
+    # The eager model is always the reference, even if not requested
+    backend_names = ["torch"] + [name for name in args.backends if name != "torch"]
+
+    reference = None
+    results = []
+    for name in backend_names:
+        print(f"\nRunning backend '{name}'...")
+        backend = load_backend(name, model, tokenizer, onnx_path=args.onnx_path)
+        probs, latencies, total = run_backend(backend, texts, args.batch_size, args.max_length)
+
+        if reference is None:
+            reference = probs
+
+        agreement = (probs.argmax(dim=1) == reference.argmax(dim=1)).float().mean().item()
+        max_prob_diff = (probs - reference).abs().max().item()
+
+        result = {
+            "backend": name,
+            "texts": len(texts),
+            "batch_size": args.batch_size,
+            "label_agreement": round(agreement, 4),
+            "max_prob_diff": round(max_prob_diff, 4),
+            "latency_ms_p50": round(percentile(latencies, 50), 2),
+            "latency_ms_p95": round(percentile(latencies, 95), 2),
+            "throughput_texts_per_s": round(len(texts) / total, 2),
+            "within_tolerance": agreement >= args.tolerance,
+        }
+        results.append(result)
+        print(json.dumps(result, indent=2))
+
+    passing = [r for r in results if r["within_tolerance"]]
+    fastest = max(passing, key=lambda r: r["throughput_texts_per_s"]) if passing else None
+
+    print(f"\n{'backend':<12} {'agree':>7} {'maxdiff':>8} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>9}")
+    for r in results:
+        print(f"{r['backend']:<12} {r['label_agreement']:>7.4f} {r['max_prob_diff']:>8.4f} "
+              f"{r['latency_ms_p50']:>8.2f} {r['latency_ms_p95']:>8.2f} {r['throughput_texts_per_s']:>9.2f}")
+
+    if fastest:
+        print(f"\nFastest backend within tolerance ({args.tolerance}): {fastest['backend']}")
+        print(f"Set INFERENCE_BACKEND={fastest['backend']} to use it")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "recommended": fastest["backend"] if fastest else None}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
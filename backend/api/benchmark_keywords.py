@@ -0,0 +1,121 @@
+"""
+Compare keyword extraction engines on the Reddit queries they produce.
+
+Runs each engine over posts from unlabelled_data_clean.csv and reports
+per-post latency and, relative to KeyBERT, how often the resulting Reddit
+search query is identical and the mean keyword overlap (Jaccard). IDF
+statistics for the lexical engine are built from the CSV unless --idf points
+at a file produced by `lexical_keywords.py build`.
+
+Usage:
+    python benchmark_keywords.py --limit 500 --engines keybert lexical
+    python benchmark_keywords.py --engines keybert keybert-classifier lexical --model ./bias_model
+"""
+import argparse
+import json
+import time
+
+from keybert import KeyBERT
+
+from benchmark_backends import load_texts, percentile
+from lexical_keywords import IDFStats, LexicalKeywordExtractor, iter_csv_texts
+
+
+def build_engine(name, args):
+    if name == "keybert":
+        return KeyBERT()
+    if name == "keybert-classifier":
+        from embeddings import SharedEncoder, ClassifierEmbedder
+        from model_store import load_model_artifact
+
+        model, tokenizer = load_model_artifact(args.model)
+        return KeyBERT(model=ClassifierEmbedder(SharedEncoder(model, tokenizer)))
+    if name == "lexical":
+        idf = IDFStats.load(args.idf) if args.idf else IDFStats.build(iter_csv_texts([args.data]))
+        return LexicalKeywordExtractor(idf)
+    raise ValueError(f"Unknown keyword engine '{name}'")
+
+
+def run_engine(engine, texts, top_n):
+    """Return (queries as keyword lists, per-post latencies in ms, total seconds)"""
+    # One untimed call so lazy initialization doesn't skew the first measurement
+    engine.extract_keywords(texts[0], top_n=top_n)
+
+    queries = []
+    latencies = []
+    start = time.perf_counter()
+    for text in texts:
+        call_start = time.perf_counter()
+        keywords = engine.extract_keywords(text, top_n=top_n)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+        queries.append([word for word, _ in keywords])
+    total = time.perf_counter() - start
+    return queries, latencies, total
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="../database/data/unlabelled_data_clean.csv", help="CSV with title/body columns")
+    parser.add_argument("--engines", nargs="+", default=["keybert", "lexical"],
+                        choices=["keybert", "keybert-classifier", "lexical"])
+    parser.add_argument("--model", default="./bias_model", help="Model for the keybert-classifier engine")
+    parser.add_argument("--idf", help="IDF statistics JSON for the lexical engine")
+    parser.add_argument("--limit", type=int, default=500, help="Number of CSV rows to use")
+    parser.add_argument("--top-n", type=int, default=3, help="Keywords per query, as in extract_keywords()")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    texts = load_texts(args.data, args.limit)
+    print(f"Loaded {len(texts)} texts from {args.data}")
+
+    # KeyBERT is always the reference, even if not requested
+    engine_names = ["keybert"] + [name for name in args.engines if name != "keybert"]
+
+    reference = None
+    results = []
+    for name in engine_names:
+        print(f"\nRunning engine '{name}'...")
+        queries, latencies, total = run_engine(build_engine(name, args), texts, args.top_n)
+
+        if reference is None:
+            reference = queries
+
+        same_query = sum(" ".join(q) == " ".join(r) for q, r in zip(queries, reference)) / len(texts)
+        overlap = sum(jaccard(q, r) for q, r in zip(queries, reference)) / len(texts)
+
+        result = {
+            "engine": name,
+            "texts": len(texts),
+            "same_query_rate": round(same_query, 4),
+            "mean_keyword_jaccard": round(overlap, 4),
+            "latency_ms_p50": round(percentile(latencies, 50), 3),
+            "latency_ms_p95": round(percentile(latencies, 95), 3),
+            "throughput_texts_per_s": round(len(texts) / total, 2),
+            "examples": [
+                {"keybert": " ".join(r), name: " ".join(q)}
+                for q, r in list(zip(queries, reference))[:5]
+            ],
+        }
+        results.append(result)
+        print(json.dumps(result, indent=2))
+
+    print(f"\n{'engine':<20} {'same q':>7} {'jaccard':>8} {'p50 ms':>9} {'p95 ms':>9} {'texts/s':>9}")
+    for r in results:
+        print(f"{r['engine']:<20} {r['same_query_rate']:>7.4f} {r['mean_keyword_jaccard']:>8.4f} "
+              f"{r['latency_ms_p50']:>9.3f} {r['latency_ms_p95']:>9.3f} {r['throughput_texts_per_s']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Offline bulk labelling of the seeded corpus with the bias classifier.
+
+Streams rows in chunks from a MySQL table (keyset pagination on its primary
+key) or a CSV, classifies each chunk in a pool of worker processes (each
+running the length-bucketed `predict_proba` of an inference backend), and
+writes `predicted_label`, `confidence` and `prob_left/neutral/right` back in
+bulk. Progress is saved to a checkpoint file after every chunk is written, so
+an interrupted run resumes where it stopped. Only a bounded number of chunks
+are in flight, so memory stays constant regardless of table size.
+
+Usage:
+    python bulk_label.py --table redditposts --workers 4
+    python bulk_label.py --csv ../database/data/unlabelled_data_clean.csv --output labelled.csv
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text, MetaData, Table, Column, BigInteger, String, Float
+
+# Same order as label_mapping in combined_api.py
+LABELS = ("left", "neutral", "right")
+RESULT_COLUMNS = {
+    "predicted_label": "VARCHAR(16)",
+    "confidence": "FLOAT",
+    "prob_left": "FLOAT",
+    "prob_neutral": "FLOAT",
+    "prob_right": "FLOAT",
+}
+
+
+# --- WORKER PROCESS ---
+_backend = None
+
+
+def init_worker(model_path, backend_name, threads, token_budget):
+    """Load the model once per worker process"""
+    global _backend
+    import torch
+    from inference import load_backend
+    from model_store import load_model_artifact
+
+    torch.set_num_threads(threads)
+    model, tokenizer = load_model_artifact(model_path)
+    _backend = load_backend(backend_name, model, tokenizer, token_budget=token_budget)
+
+
+def label_chunk(keys, texts, max_length):
+    """Classify one chunk, returning result rows keyed like the source rows"""
+    probs = _backend.predict_proba(texts, max_length=max_length)
+    rows = []
+    for key, row in zip(keys, probs.tolist()):
+        best = max(range(len(LABELS)), key=row.__getitem__)
+        rows.append({
+            "row_key": key,
+            "predicted_label": LABELS[best],
+            "confidence": round(row[best], 4),
+            "prob_left": round(row[0], 4),
+            "prob_neutral": round(row[1], 4),
+            "prob_right": round(row[2], 4),
+        })
+    return rows
+
+
+def row_text(title, body):
+    return f"{'' if pd.isna(title) else title} {'' if pd.isna(body) else body}".strip()
+
+
+# --- SOURCES AND SINKS ---
+class TableJob:
+    """Label rows of a database table in primary-key order, updating them in place"""
+
+    def __init__(self, engine, table, chunk_size):
+        self.engine = engine
+        self.table = table
+        self.chunk_size = chunk_size
+        self.key = self._ensure_schema()
+        self.staging = Table(
+            f"_{table}_labels",
+            MetaData(),
+            Column("row_key", BigInteger, primary_key=True),
+            Column("predicted_label", String(16)),
+            Column("confidence", Float),
+            Column("prob_left", Float),
+            Column("prob_neutral", Float),
+            Column("prob_right", Float),
+            prefixes=["TEMPORARY"],
+        )
+        self.conn = engine.connect()
+        self.staging.create(self.conn)
+        self.conn.commit()
+
+    def _ensure_schema(self):
+        """Add the result columns, and an id key if the table (as seeded by pandas) has none"""
+        inspector = inspect(self.engine)
+        columns = {c["name"] for c in inspector.get_columns(self.table)}
+        primary_key = inspector.get_pk_constraint(self.table)["constrained_columns"]
+
+        with self.engine.begin() as conn:
+            if not primary_key:
+                print(f"Adding primary key 'id' to {self.table}")
+                conn.execute(text(
+                    f"ALTER TABLE {self.table} ADD COLUMN id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY FIRST"
+                ))
+                primary_key = ["id"]
+            for name, sql_type in RESULT_COLUMNS.items():
+                if name not in columns:
+                    print(f"Adding column {self.table}.{name}")
+                    conn.execute(text(f"ALTER TABLE {self.table} ADD COLUMN {name} {sql_type} NULL"))
+        return primary_key[0]
+
+    def total_rows(self):
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {self.table}")).scalar()
+
+    def chunks(self, after_key):
+        """Yield (keys, texts), reading one chunk at a time after the checkpointed key"""
+        query = text(
+            f"SELECT {self.key}, title, body FROM {self.table} "
+            f"WHERE {self.key} > :after ORDER BY {self.key} LIMIT :limit"
+        )
+        last = after_key if after_key is not None else -1
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(query, {"after": last, "limit": self.chunk_size}).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [r[0] for r in rows], [row_text(r[1], r[2]) for r in rows]
+
+    def write(self, results):
+        """Stage the chunk with one multi-row INSERT, then apply it with one joined UPDATE"""
+        assignments = ", ".join(f"t.{name} = s.{name}" for name in RESULT_COLUMNS)
+        with self.conn.begin():
+            self.conn.execute(self.staging.insert(), results)
+            self.conn.execute(text(
+                f"UPDATE {self.table} t JOIN {self.staging.name} s ON t.{self.key} = s.row_key SET {assignments}"
+            ))
+            self.conn.execute(self.staging.delete())
+
+    def close(self):
+        self.conn.close()
+
+
+class CSVJob:
+    """Label rows of a CSV, appending them with their results to an output CSV"""
+
+    def __init__(self, path, output, chunk_size):
+        self.path = path
+        self.output = output
+        self.chunk_size = chunk_size
+        self._pending = {}
+
+    def total_rows(self):
+        return None
+
+    def chunks(self, after_key):
+        """Yield (keys, texts); keys are 0-based row numbers so resuming skips done rows"""
+        done = after_key + 1 if after_key is not None else 0
+        reader = pd.read_csv(self.path, chunksize=self.chunk_size, skiprows=range(1, done + 1))
+        for chunk in reader:
+            keys = list(range(done, done + len(chunk)))
+            done += len(chunk)
+            self._pending[keys[-1]] = chunk
+            yield keys, [row_text(t, b) for t, b in zip(chunk["title"], chunk["body"])]
+
+    def write(self, results):
+        chunk = self._pending.pop(results[-1]["row_key"])
+        for name in RESULT_COLUMNS:
+            chunk[name] = [r[name] for r in results]
+        header = not os.path.exists(self.output)
+        chunk.to_csv(self.output, mode="a", header=header, index=False)
+
+    def close(self):
+        pass
+
+
+# --- CHECKPOINT ---
+def load_checkpoint(path, source):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != source:
+        raise ValueError(f"Checkpoint {path} belongs to {checkpoint.get('source')}, not {source}; use --restart")
+    return checkpoint
+
+
+def save_checkpoint(path, source, last_key, rows):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"source": source, "last_key": last_key, "rows": rows}, f)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--table", help="Table with title/body columns to label in place")
+    source.add_argument("--csv", help="CSV with title/body columns")
+    parser.add_argument("--output", help="Output CSV (required with --csv)")
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    parser.add_argument("--model", default="./bias_model", help="Safetensors model directory or pickle file")
+    parser.add_argument("--backend", default="torch", help="Inference backend: torch, torch-int8 or onnx")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=512, help="Rows per worker task")
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--token-budget", type=int, default=8192, help="Padded tokens per forward pass")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <table or output>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args()
+
+    if args.table:
+        engine = create_engine(args.database_url or os.getenv("DATABASE_URL"))
+        job = TableJob(engine, args.table, args.chunk_size)
+        source_name = f"table:{args.table}"
+        checkpoint_path = args.checkpoint or f"{args.table}.checkpoint.json"
+    else:
+        if not args.output:
+            parser.error("--output is required with --csv")
+        job = CSVJob(args.csv, args.output, args.chunk_size)
+        source_name = f"csv:{os.path.abspath(args.csv)}"
+        checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.json"
+
+    checkpoint = None
+    if args.restart:
+        if args.csv and os.path.exists(args.output):
+            os.remove(args.output)
+    else:
+        checkpoint = load_checkpoint(checkpoint_path, source_name)
+    last_key = checkpoint["last_key"] if checkpoint else None
+    rows_done = checkpoint["rows"] if checkpoint else 0
+    if checkpoint:
+        print(f"Resuming after key {last_key} ({rows_done} rows already labelled)")
+
+    total = job.total_rows()
+    print(f"Labelling {source_name} with {args.workers} workers x {args.threads_per_worker} threads"
+          + (f" ({total} rows)" if total is not None else ""))
+
+    start = time.perf_counter()
+    labelled = 0
+    # Keep a couple of chunks queued per worker; results are written in order so
+    # the checkpoint always marks a prefix of the source as done
+    max_in_flight = args.workers * 2
+    in_flight = deque()
+
+    def drain_one():
+        nonlocal labelled, rows_done
+        results = in_flight.popleft().result()
+        job.write(results)
+        labelled += len(results)
+        rows_done += len(results)
+        save_checkpoint(checkpoint_path, source_name, results[-1]["row_key"], rows_done)
+
+        elapsed = time.perf_counter() - start
+        print(f"{rows_done} rows labelled ({labelled / elapsed:.1f} rows/s)")
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=init_worker,
+        initargs=(args.model, args.backend, args.threads_per_worker, args.token_budget)
+    ) as pool:
+        for keys, texts in job.chunks(last_key):
+            in_flight.append(pool.submit(label_chunk, keys, texts, args.max_length))
+            if len(in_flight) >= max_in_flight:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    job.close()
+    elapsed = time.perf_counter() - start
+    print(f"Done: {labelled} rows in {elapsed:.1f}s ({labelled / elapsed if elapsed else 0:.1f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
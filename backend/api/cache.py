@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from sqlalchemy import MetaData, Table, Column, String, Text, Float, select, create_engine
+from sqlalchemy.dialects import mysql, sqlite
+
+logger = logging.getLogger(__name__)
+
+
+class LRUTTLCache:
+    """Thread-safe in-process cache with LRU eviction and a per-entry TTL"""
+
+    def __init__(self, max_size=10000, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._data[key] = (value, stored_at or time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLCacheBackend:
+    """
+    Shared cache store in a SQL table so several API workers reuse each other's results.
+
+    Works against the API's MySQL database or a local SQLite file (the "disk" store).
+    """
+
+    def __init__(self, engine, table_name="classification_cache"):
+        self.engine = engine
+        self.metadata = MetaData()
+        self.table = Table(
+            table_name,
+            self.metadata,
+            Column('cache_key', String(64), primary_key=True),
+            Column('value', Text),
+            Column('created_at', Float),
+        )
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_path(cls, path, table_name="classification_cache"):
+        """Create a local disk store backed by a SQLite file"""
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        return cls(engine, table_name=table_name)
+
+    def create_table(self):
+        self.metadata.create_all(bind=self.engine)
+
+    def get_many(self, keys, ttl=None):
+        """Return {key: (value, created_at)} for the unexpired keys found"""
+        if not keys:
+            return {}
+        try:
+            query = select(self.table.c.cache_key, self.table.c.value, self.table.c.created_at).where(
+                self.table.c.cache_key.in_(list(keys))
+            )
+            with self.engine.connect() as conn:
+                rows = conn.execute(query).fetchall()
+        except Exception as e:
+            logger.warning("cache backend read error", extra={"error": str(e)})
+            self.errors += 1
+            return {}
+
+        now = time.time()
+        found = {}
+        for key, value, created_at in rows:
+            if ttl and now - created_at > ttl:
+                continue
+            found[key] = (json.loads(value), created_at)
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, items):
+        """Upsert {key: value} into the shared table"""
+        if not items:
+            return
+        now = time.time()
+        rows = [{"cache_key": k, "value": json.dumps(v), "created_at": now} for k, v in items.items()]
+
+        dialect = self.engine.dialect.name
+        try:
+            with self.engine.begin() as conn:
+                if dialect == "mysql":
+                    stmt = mysql.insert(self.table).values(rows)
+                    stmt = stmt.on_duplicate_key_update(value=stmt.inserted.value, created_at=stmt.inserted.created_at)
+                elif dialect == "sqlite":
+                    stmt = sqlite.insert(self.table).values(rows)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["cache_key"],
+                        set_={"value": stmt.excluded.value, "created_at": stmt.excluded.created_at}
+                    )
+                else:
+                    conn.execute(self.table.delete().where(self.table.c.cache_key.in_(list(items))))
+                    stmt = self.table.insert().values(rows)
+                conn.execute(stmt)
+        except Exception as e:
+            logger.warning("cache backend write error", extra={"error": str(e)})
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "type": self.engine.dialect.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+def normalize_text(text):
+    """Collapse whitespace and unicode forms so equivalent posts hash the same"""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class ClassificationCache:
+    """
+    Content-addressed cache of classification results.
+
+    Keys are a SHA-256 of the model version, the truncation length and the
+    normalized text, so results are never reused across model releases. Lookups
+    go to the in-process LRU first and then to the optional shared backend.
+    """
+
+    def __init__(self, model_version, max_size=10000, ttl_seconds=3600, backend=None):
+        self.model_version = model_version
+        self.local = LRUTTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.backend = backend
+
+    def make_key(self, text, max_length):
+        payload = f"{self.model_version}\x00{max_length}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: value} for every key found locally or in the shared backend"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        if missing and self.backend is not None:
+            for key, (value, created_at) in self.backend.get_many(missing, ttl=self.local.ttl).items():
+                self.local.set(key, value, stored_at=created_at)
+                found[key] = value
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items):
+        for key, value in items.items():
+            self.local.set(key, value)
+        if self.backend is not None:
+            self.backend.set_many(items)
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def stats(self):
+        stats = self.local.stats()
+        stats["model_version"] = self.model_version
+        stats["shared_backend"] = self.backend.stats() if self.backend is not None else None
+        return stats
+
+
+class StaleWhileRevalidateCache:
+    """
+    Bounded async cache with stale-while-revalidate refresh.
+
+    Entries younger than `ttl_seconds` are served as-is. Entries up to
+    `stale_ttl_seconds` old are still served immediately, but trigger a single
+    background refresh. Concurrent misses for the same key share one fetch,
+    and a miss never waits on a background refresh (which returns nothing).
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_size=1000, ttl_seconds=900, stale_ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.stale_ttl = max(stale_ttl_seconds, ttl_seconds)
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._refreshing = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    def _store(self, key, value):
+        self._data[key] = (value, time.time())
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            self._store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _refresh(self, key, fetch):
+        try:
+            value = await fetch()
+            self._store(key, value)
+            self.refreshes += 1
+        except Exception as e:
+            # Keep serving the stale value; the next request retries
+            self.refresh_errors += 1
+            logger.warning("background refresh failed", extra={"key": key, "error": str(e)})
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling the `fetch` coroutine function on a miss"""
+        entry = self._data.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age <= self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            if age <= self.stale_ttl:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._refreshing and key not in self._inflight:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, fetch))
+                return value
+            del self._data[key]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "background_refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+            "fetching": len(self._inflight),
+        }
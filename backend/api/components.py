@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class ComponentTracker:
+    """
+    Load state of the API's components, for the liveness/readiness endpoints.
+
+    Components listed in `required` must be ready before the API reports
+    ready; the rest (keyword model, Reddit client, recommendation index) are
+    loaded in the background or on first use and only reported. Each component
+    moves pending -> loading -> ready, or failed with the error.
+    """
+
+    def __init__(self, required, optional=()):
+        self.required = tuple(required)
+        self._lock = threading.Lock()
+        self._components = {
+            name: {"state": PENDING, "seconds": None, "error": None}
+            for name in (*self.required, *optional)
+        }
+
+    def _set(self, name, **fields):
+        with self._lock:
+            self._components.setdefault(name, {"state": PENDING, "seconds": None, "error": None}).update(fields)
+
+    def load(self, name, fn, *args, **kwargs):
+        """Run `fn` as the loader for `name`, recording its state and duration; re-raises failures"""
+        self._set(name, state=LOADING, error=None)
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._set(name, state=FAILED, seconds=round(time.perf_counter() - start, 3), error=str(e))
+            logger.exception("component failed to load", extra={"component": name})
+            raise
+        seconds = round(time.perf_counter() - start, 3)
+        self._set(name, state=READY, seconds=seconds)
+        logger.info("component ready", extra={"component": name, "seconds": seconds})
+        return result
+
+    async def load_in_thread(self, name, fn, *args, **kwargs):
+        """`load` on a worker thread, so independent components load concurrently"""
+        return await asyncio.to_thread(self.load, name, fn, *args, **kwargs)
+
+    def state(self, name):
+        with self._lock:
+            return self._components[name]["state"]
+
+    def is_ready(self, name):
+        return self.state(name) == READY
+
+    def ready(self):
+        return all(self.is_ready(name) for name in self.required)
+
+    def failed(self):
+        """Required components that failed; the process cannot become ready without a restart"""
+        return [name for name in self.required if self.state(name) == FAILED]
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(status) for name, status in self._components.items()}
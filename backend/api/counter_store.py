@@ -0,0 +1,288 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import MetaData, Table, Column, String, Integer, DateTime, select, func
+from sqlalchemy.dialects import mysql, sqlite
+
+BIAS_LEANINGS = ("left", "right")
+
+
+def check_threshold(counts, threshold):
+    """Return the leaning whose count reached the threshold (left wins ties), else None"""
+    for leaning in BIAS_LEANINGS:
+        if counts[leaning] >= threshold:
+            return leaning
+    return None
+
+
+class CounterStore:
+    """
+    Per-user left/right counters for bias tracking.
+
+    `increment_and_check` atomically adds one to the user's count for `leaning`
+    (neutral leaves counts unchanged), and if either count has reached
+    `threshold` resets both to zero. It returns the counts before any reset and
+    the leaning that tripped the threshold, so exactly one caller sees each trip
+    even when several workers share the store.
+    """
+
+    # Whether calls do network / disk I/O and should run off the event loop
+    blocking = False
+
+    def setup(self):
+        """Create any backing storage"""
+
+    def increment_and_check(self, user_id, leaning, threshold):
+        raise NotImplementedError
+
+    def get_counts(self, user_id):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"type": self.name}
+
+
+class InMemoryCounterStore(CounterStore):
+    """Process-local counters with a bounded user count and idle-user eviction"""
+
+    name = "memory"
+
+    def __init__(self, max_users=100000, idle_ttl_seconds=86400):
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl_seconds
+        self._counts = OrderedDict()  # user_id -> (counts, last_seen), least recently seen first
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _evict(self, now):
+        while self._counts:
+            user_id, (_, last_seen) = next(iter(self._counts.items()))
+            if len(self._counts) > self.max_users or (self.idle_ttl and now - last_seen > self.idle_ttl):
+                del self._counts[user_id]
+                self.evictions += 1
+            else:
+                break
+
+    def increment_and_check(self, user_id, leaning, threshold):
+        now = time.time()
+        with self._lock:
+            entry = self._counts.pop(user_id, None)
+            counts = entry[0] if entry else {"left": 0, "right": 0}
+            if leaning in BIAS_LEANINGS:
+                counts[leaning] += 1
+
+            snapshot = dict(counts)
+            bias = check_threshold(counts, threshold)
+            if bias:
+                counts = {"left": 0, "right": 0}
+
+            self._counts[user_id] = (counts, now)
+            self._evict(now)
+        return snapshot, bias
+
+    def get_counts(self, user_id):
+        return self.peek(user_id) or {"left": 0, "right": 0}
+
+    def peek(self, user_id, max_age=None):
+        """Return the user's counts, or None if not tracked or last written more than `max_age` seconds ago"""
+        with self._lock:
+            entry = self._counts.get(user_id)
+            if entry is None or (max_age is not None and time.time() - entry[1] > max_age):
+                return None
+            return dict(entry[0])
+
+    def put(self, user_id, counts):
+        """Overwrite the user's counts (used when caching another store's result)"""
+        now = time.time()
+        with self._lock:
+            self._counts.pop(user_id, None)
+            self._counts[user_id] = (dict(counts), now)
+            self._evict(now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "type": self.name,
+                "users": len(self._counts),
+                "max_users": self.max_users,
+                "idle_ttl_seconds": self.idle_ttl,
+                "evictions": self.evictions,
+            }
+
+
+class SQLCounterStore(CounterStore):
+    """
+    Counters in a `user_bias_counts` table shared by every worker and replica.
+    The upsert takes the row lock, so the read-check-reset that follows in the
+    same transaction is serialized per user.
+    """
+
+    name = "sql"
+    blocking = True
+
+    def __init__(self, engine, table_name="user_bias_counts"):
+        self.engine = engine
+        self.metadata = MetaData()
+        self.table = Table(
+            table_name,
+            self.metadata,
+            Column('user_id', String(255), primary_key=True),
+            Column('left_count', Integer, nullable=False, default=0),
+            Column('right_count', Integer, nullable=False, default=0),
+            Column('updated_at', DateTime, default=func.now(), onupdate=func.now()),
+        )
+
+    def setup(self):
+        self.metadata.create_all(bind=self.engine)
+
+    def _upsert(self, user_id, left, right):
+        row = {"user_id": user_id, "left_count": left, "right_count": right}
+        increments = {
+            "left_count": self.table.c.left_count + left,
+            "right_count": self.table.c.right_count + right,
+            "updated_at": func.now(),
+        }
+        dialect = self.engine.dialect.name
+        if dialect == "mysql":
+            return mysql.insert(self.table).values(row).on_duplicate_key_update(**increments)
+        if dialect == "sqlite":
+            return sqlite.insert(self.table).values(row).on_conflict_do_update(
+                index_elements=["user_id"], set_=increments
+            )
+        raise ValueError(f"SQLCounterStore does not support the {dialect} dialect")
+
+    def increment_and_check(self, user_id, leaning, threshold):
+        left = 1 if leaning == "left" else 0
+        right = 1 if leaning == "right" else 0
+
+        with self.engine.begin() as conn:
+            conn.execute(self._upsert(user_id, left, right))
+            row = conn.execute(
+                select(self.table.c.left_count, self.table.c.right_count)
+                .where(self.table.c.user_id == user_id)
+                .with_for_update()
+            ).one()
+            counts = {"left": row.left_count, "right": row.right_count}
+
+            bias = check_threshold(counts, threshold)
+            if bias:
+                conn.execute(
+                    self.table.update()
+                    .where(self.table.c.user_id == user_id)
+                    .values(left_count=0, right_count=0)
+                )
+        return counts, bias
+
+    def get_counts(self, user_id):
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.left_count, self.table.c.right_count)
+                .where(self.table.c.user_id == user_id)
+            ).first()
+        if row is None:
+            return {"left": 0, "right": 0}
+        return {"left": row.left_count, "right": row.right_count}
+
+
+# Runs atomically inside Redis: increment, read both counts, reset on threshold
+_REDIS_INCREMENT_SCRIPT = """
+if ARGV[1] ~= '' then
+    redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+end
+local left = tonumber(redis.call('HGET', KEYS[1], 'left') or '0')
+local right = tonumber(redis.call('HGET', KEYS[1], 'right') or '0')
+local threshold = tonumber(ARGV[2])
+if left >= threshold or right >= threshold then
+    redis.call('DEL', KEYS[1])
+elseif tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {left, right}
+"""
+
+
+class RedisCounterStore(CounterStore):
+    """
+    Counters in a Redis-compatible server (Redis, Valkey, KeyDB), one hash per
+    user. A Lua script makes increment-and-check atomic; idle users expire.
+    An existing client (e.g. fakeredis in tests) can be passed instead of a URL.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, url=None, idle_ttl_seconds=86400, key_prefix="bias_counts:", client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.idle_ttl = idle_ttl_seconds
+        self.key_prefix = key_prefix
+        self._script = self.client.register_script(_REDIS_INCREMENT_SCRIPT)
+
+    def increment_and_check(self, user_id, leaning, threshold):
+        field = leaning if leaning in BIAS_LEANINGS else ""
+        left, right = self._script(
+            keys=[self.key_prefix + user_id],
+            args=[field, threshold, self.idle_ttl or 0]
+        )
+        counts = {"left": int(left), "right": int(right)}
+        return counts, check_threshold(counts, threshold)
+
+    def get_counts(self, user_id):
+        left, right = self.client.hmget(self.key_prefix + user_id, "left", "right")
+        return {"left": int(left or 0), "right": int(right or 0)}
+
+
+class WriteThroughCounterStore(CounterStore):
+    """
+    In-process write-through cache in front of a shared store.
+
+    Every increment goes to the shared store (which stays the authority for
+    threshold checks) and the result is cached locally. Calls that cannot change
+    the counts (neutral posts) and `get_counts` are answered from the cache
+    without a round trip while the entry is younger than `cache_ttl_seconds`.
+    With several workers those answers can miss increments made by other
+    workers within that window; threshold trips are never affected.
+    """
+
+    def __init__(self, store, max_users=100000, idle_ttl_seconds=86400, cache_ttl_seconds=5):
+        self.store = store
+        self.name = f"{store.name}+cache"
+        self.blocking = store.blocking
+        self.cache = InMemoryCounterStore(max_users=max_users, idle_ttl_seconds=idle_ttl_seconds)
+        self.cache_ttl = cache_ttl_seconds
+        self.cache_hits = 0
+
+    def setup(self):
+        self.store.setup()
+
+    def increment_and_check(self, user_id, leaning, threshold):
+        if leaning not in BIAS_LEANINGS:
+            cached = self.cache.peek(user_id, max_age=self.cache_ttl)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached, None
+
+        counts, bias = self.store.increment_and_check(user_id, leaning, threshold)
+        self.cache.put(user_id, {"left": 0, "right": 0} if bias else counts)
+        return counts, bias
+
+    def get_counts(self, user_id):
+        cached = self.cache.peek(user_id, max_age=self.cache_ttl)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        counts = self.store.get_counts(user_id)
+        self.cache.put(user_id, counts)
+        return counts
+
+    def stats(self):
+        stats = self.store.stats()
+        stats["type"] = self.name
+        stats["cache"] = self.cache.stats()
+        stats["cache_hits"] = self.cache_hits
+        stats["cache_ttl_seconds"] = self.cache_ttl
+        return stats
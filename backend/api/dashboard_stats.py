@@ -0,0 +1,104 @@
+"""
+Aggregate queries behind the /api/stats/* dashboard endpoints.
+
+Without a user the aggregates come from the activity rollups (rollups.py); for
+one user they come from that user's user_activity rows through the
+(user_id, timestamp) index. With `rollups=False` (ACTIVITY_ROLLUPS=false, so
+the rollup tables are not kept up to date) the global aggregates scan
+user_activity instead. Each function takes an open connection and returns
+JSON-serializable rows.
+"""
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import text
+
+
+def rows(result):
+    return [dict(row._mapping) for row in result]
+
+
+def activity_filter(user_id):
+    """WHERE prefix restricting user_activity to one user, or to every user"""
+    return "user_id = :user_id AND " if user_id else ""
+
+
+def json_default(value):
+    """json.dumps fallback for the DECIMAL sums/averages and DATE columns MySQL returns"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def political_spectrum(conn, user_id=None, days=30, rollups=True):
+    """Posts and distinct users per bias label over the last `days` days"""
+    if user_id or not rollups:
+        return rows(conn.execute(text(f"""
+            SELECT bias_label, COUNT(*) as post_count, COUNT(DISTINCT user_id) as unique_users
+            FROM user_activity
+            WHERE {activity_filter(user_id)}timestamp >= DATE_SUB(NOW(), INTERVAL :days DAY)
+            GROUP BY bias_label
+            ORDER BY post_count DESC
+        """), {"user_id": user_id, "days": days}))
+
+    return rows(conn.execute(text("""
+        SELECT posts.bias_label, posts.post_count, COALESCE(users.unique_users, 0) as unique_users
+        FROM (
+            SELECT bias_label, SUM(post_count) as post_count
+            FROM activity_rollup_hourly
+            WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL :days DAY)
+            GROUP BY bias_label
+        ) posts
+        LEFT JOIN (
+            SELECT bias_label, COUNT(DISTINCT user_id) as unique_users
+            FROM activity_rollup_daily_users
+            WHERE bucket_date >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+            GROUP BY bias_label
+        ) users ON users.bias_label = posts.bias_label
+        ORDER BY posts.post_count DESC
+    """), {"days": days}))
+
+
+def top_subreddits(conn, user_id=None, days=30, limit=5, rollups=True):
+    """Most active subreddits with post counts and average title length"""
+    if user_id or not rollups:
+        return rows(conn.execute(text(f"""
+            SELECT subreddit, COUNT(*) as post_count, AVG(LENGTH(title)) as avg_title_length
+            FROM user_activity
+            WHERE {activity_filter(user_id)}timestamp >= DATE_SUB(NOW(), INTERVAL :days DAY)
+            GROUP BY subreddit
+            ORDER BY post_count DESC
+            LIMIT :limit
+        """), {"user_id": user_id, "days": days, "limit": limit}))
+
+    return rows(conn.execute(text("""
+        SELECT subreddit, SUM(post_count) as post_count,
+               SUM(title_length_sum) / SUM(post_count) as avg_title_length
+        FROM activity_rollup_hourly
+        WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL :days DAY)
+        GROUP BY subreddit
+        ORDER BY post_count DESC
+        LIMIT :limit
+    """), {"days": days, "limit": limit}))
+
+
+def daily_activity(conn, user_id=None, days=7, rollups=True):
+    """Posts viewed per day for the last `days` days, including today"""
+    if user_id or not rollups:
+        return rows(conn.execute(text(f"""
+            SELECT DATE(timestamp) as day, COUNT(*) as post_count
+            FROM user_activity
+            WHERE {activity_filter(user_id)}timestamp >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+            GROUP BY day
+            ORDER BY day
+        """), {"user_id": user_id, "days": days - 1}))
+
+    return rows(conn.execute(text("""
+        SELECT DATE(bucket_start) as day, SUM(post_count) as post_count
+        FROM activity_rollup_hourly
+        WHERE bucket_start >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+        GROUP BY day
+        ORDER BY day
+    """), {"days": days - 1}))
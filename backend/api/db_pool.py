@@ -0,0 +1,118 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts wait for a connection.
+
+    Once `pool_size + max_overflow` connections are checked out, callers block
+    (up to `timeout` seconds) until one is returned. The time spent acquiring
+    each connection and the number of callers currently waiting are tracked so
+    pool exhaustion shows up in the metrics instead of only as request latency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        with self._metrics_lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._metrics_lock:
+                self.waiting -= 1
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class PoolMetrics:
+    """Connection churn and utilisation counters for an engine's pool"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.connects = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        pool = self.engine.pool
+        stats = {
+            "pool_class": type(pool).__name__,
+            "connections_opened": self.connects,
+            "invalidations": self.invalidations,
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        if isinstance(pool, InstrumentedQueuePool):
+            with pool._metrics_lock:
+                stats.update({
+                    "waiting": pool.waiting,
+                    "max_waiting": pool.max_waiting,
+                    "checkouts": pool.checkouts,
+                    "checkout_timeouts": pool.timeouts,
+                    "avg_wait_ms": round(pool.total_wait / pool.checkouts * 1000.0, 3) if pool.checkouts else 0.0,
+                    "max_wait_ms": round(pool.max_wait * 1000.0, 3),
+                })
+        return stats
+
+
+def create_pooled_engine(url, pool_size=10, max_overflow=20, pool_timeout=30, pool_recycle=1800, pre_ping=True):
+    """
+    Create an engine with an explicitly sized, instrumented connection pool.
+
+    `pool_recycle` replaces connections older than that many seconds, before
+    MySQL's wait_timeout closes them server-side; `pre_ping` tests a connection
+    on checkout and transparently reconnects if it has gone away. In-memory
+    SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return create_engine(url)
+
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pre_ping,
+    )
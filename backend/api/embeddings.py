@@ -0,0 +1,89 @@
+import numpy as np
+import torch
+from keybert.backend import BaseEmbedder
+
+from cache import LRUTTLCache
+from metrics import timed, observe_batch
+
+
+class SharedEncoder:
+    """
+    Sentence embeddings from the bias classifier's own RoBERTa encoder.
+
+    Texts are embedded by mean-pooling the classifier's last hidden state, so
+    keyword extraction needs no second transformer in memory. Every embedding
+    is kept in an LRU keyed by truncation length and text: candidate n-grams
+    are reused across requests, and `classify_and_embed` stores the post
+    embedding produced by the classification pass so KeyBERT does not encode
+    the post again (when the post fits within `max_length`, its embedding is
+    the same at either length and is stored under both).
+    """
+
+    def __init__(self, model, tokenizer, max_length=256, batch_size=64, cache_size=10000):
+        self.encoder = model.base_model
+        self.head = model.classifier
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache = LRUTTLCache(max_size=cache_size, ttl_seconds=0)
+
+    def _encode(self, texts, max_length):
+        """Return (last hidden state, L2-normalized mean-pooled embeddings, token lengths)"""
+        with timed("tokenization"):
+            inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=max_length)
+        lengths = inputs["attention_mask"].sum(dim=1).tolist()
+        observe_batch(lengths)
+        with timed("model_forward"), torch.no_grad():
+            hidden = self.encoder(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        pooled = torch.nn.functional.normalize(pooled, dim=1)
+        return hidden, pooled.numpy().astype(np.float32), lengths
+
+    def embed(self, texts):
+        """Embed texts, only running the encoder on ones not already cached"""
+        vectors = [self.cache.get((self.max_length, text)) for text in texts]
+        missing = sorted({text for text, vector in zip(texts, vectors) if vector is None}, key=len)
+
+        # Computed vectors are kept locally; a concurrent request may evict them from the cache
+        computed = {}
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            _, pooled, _ = self._encode(batch, self.max_length)
+            for text, vector in zip(batch, pooled):
+                self.cache.set((self.max_length, text), vector)
+                computed[text] = vector
+
+        if missing:
+            vectors = [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+        return np.vstack(vectors) if vectors else np.zeros((0, self.encoder.config.hidden_size), dtype=np.float32)
+
+    def classify_and_embed(self, texts, max_length=512, return_embeddings=False):
+        """
+        Run one encoder pass that yields class probabilities and caches each
+        text's embedding; with `return_embeddings` also return the embeddings.
+        """
+        hidden, pooled, lengths = self._encode(texts, max_length)
+        with torch.no_grad():
+            logits = self.head(hidden)
+        for text, vector, length in zip(texts, pooled, lengths):
+            self.cache.set((max_length, text), vector)
+            if length < min(max_length, self.max_length):
+                # Not truncated at either length, so embed() would produce the same vector
+                self.cache.set((self.max_length, text), vector)
+        probs = torch.softmax(logits, dim=1)
+        return (probs, pooled) if return_embeddings else probs
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class ClassifierEmbedder(BaseEmbedder):
+    """KeyBERT backend that embeds documents and candidates with the SharedEncoder"""
+
+    def __init__(self, shared_encoder):
+        super().__init__()
+        self.shared_encoder = shared_encoder
+
+    def embed(self, documents, verbose=False):
+        return self.shared_encoder.embed(list(documents))
@@ -0,0 +1,213 @@
+import logging
+import os
+import time
+
+import torch
+
+from batching import length_buckets
+from metrics import timed, observe_batch
+
+logger = logging.getLogger(__name__)
+
+COMPILE_MODES = ("none", "torchscript", "torch-compile")
+
+
+class InferenceBackend:
+    """
+    Shared prediction path for every backend.
+
+    Subclasses only implement `forward`, which maps a padded batch to logits;
+    tokenization, length bucketing and softmax live here so all backends are
+    interchangeable behind `predict_proba`.
+    """
+
+    name = "base"
+    tensor_type = "pt"
+
+    def __init__(self, tokenizer, num_labels, token_budget=8192, bucket_max_size=64):
+        self.tokenizer = tokenizer
+        self.num_labels = num_labels
+        self.token_budget = token_budget
+        self.bucket_max_size = bucket_max_size
+
+    def forward(self, inputs):
+        raise NotImplementedError
+
+    def predict_proba(self, texts, max_length=256):
+        """
+        Return class probabilities for texts, in input order.
+        Texts are tokenized once, bucketed by length and each bucket is padded
+        only to its own longest member before the forward pass.
+        """
+        with timed("tokenization"):
+            encodings = self.tokenizer(texts, truncation=True, max_length=max_length)
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+
+        probs = torch.empty((len(texts), self.num_labels))
+        for bucket in length_buckets(lengths, max_tokens=self.token_budget, max_batch_size=self.bucket_max_size):
+            with timed("tokenization"):
+                features = [{key: encodings[key][i] for key in encodings.keys()} for i in bucket]
+                inputs = self.tokenizer.pad(features, return_tensors=self.tensor_type)
+            observe_batch([lengths[i] for i in bucket])
+            with timed("model_forward"):
+                logits = torch.as_tensor(self.forward(inputs))
+            probs[bucket] = torch.softmax(logits, dim=1)
+        return probs
+
+
+class TorchBackend(InferenceBackend):
+    """
+    Eager full-precision PyTorch model, optionally compiled.
+
+    `compile_mode` "torchscript" traces the classifier and "torch-compile"
+    wraps it with torch.compile (dynamic shapes). A compiled model is checked
+    against the eager one at a few sequence lengths; if it fails or drifts the
+    backend stays eager.
+    """
+
+    name = "torch"
+
+    def __init__(self, model, tokenizer, compile_mode="none", **kwargs):
+        super().__init__(tokenizer, model.config.num_labels, **kwargs)
+        self.model = model
+        self.compiled = None
+        self.compile_mode = "none"
+        if compile_mode != "none":
+            self._compile(compile_mode)
+
+    def _compile(self, mode):
+        if mode not in COMPILE_MODES:
+            raise ValueError(f"Unknown compile mode '{mode}', expected one of {COMPILE_MODES}")
+        try:
+            compiled = compile_classifier(self.model, self.tokenizer, mode)
+            for length in (16, 64, 200):
+                inputs = self.tokenizer([" ".join(["check"] * length)] * 2, return_tensors="pt")
+                with torch.no_grad():
+                    expected = self.model(**inputs).logits
+                    actual = compiled(inputs["input_ids"], inputs["attention_mask"])
+                if not torch.allclose(expected, actual, atol=1e-3):
+                    raise ValueError(f"outputs differ from the eager model at length {length}")
+        except Exception as e:
+            logger.warning("model compilation failed, running eager", extra={"mode": mode, "error": str(e)})
+            return
+        self.compiled = compiled
+        self.compile_mode = mode
+
+    def forward(self, inputs):
+        with torch.no_grad():
+            if self.compiled is not None:
+                return self.compiled(inputs["input_ids"], inputs["attention_mask"])
+            return self.model(**inputs).logits
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """Eager PyTorch with Linear layers dynamically quantized to int8"""
+
+    name = "torch-int8"
+
+    def __init__(self, model, tokenizer, **kwargs):
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        quantized.eval()
+        super().__init__(quantized, tokenizer, **kwargs)
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wrap the classifier so the exported graph has plain tensor inputs and a single output"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def compile_classifier(model, tokenizer, mode):
+    """Trace the classifier with TorchScript or wrap it with torch.compile"""
+    wrapped = _LogitsOnly(model).eval()
+    if mode == "torch-compile":
+        return torch.compile(wrapped, dynamic=True)
+
+    dummy = tokenizer(["Tracing the bias model with TorchScript"] * 2, return_tensors="pt")
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapped, (dummy["input_ids"], dummy["attention_mask"]), strict=False)
+    return torch.jit.freeze(traced.eval())
+
+
+def export_onnx(model, tokenizer, onnx_path, opset_version=14):
+    """Export the classifier to ONNX with dynamic batch and sequence axes"""
+    dummy = tokenizer(["Exporting the bias model to ONNX"], return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            onnx_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset_version,
+        )
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime CPU session, exported from the PyTorch model on first use"""
+
+    name = "onnx"
+    tensor_type = "np"
+
+    def __init__(self, model, tokenizer, onnx_path="./bias_model.onnx", **kwargs):
+        import onnxruntime as ort
+
+        super().__init__(tokenizer, model.config.num_labels, **kwargs)
+        if not os.path.exists(onnx_path):
+            logger.info("exporting ONNX model", extra={"path": onnx_path})
+            export_onnx(model, tokenizer, onnx_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def forward(self, inputs):
+        feed = {
+            "input_ids": inputs["input_ids"].astype("int64"),
+            "attention_mask": inputs["attention_mask"].astype("int64"),
+        }
+        return self.session.run(["logits"], feed)[0]
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name, model, tokenizer, **kwargs):
+    """Build the inference backend selected by INFERENCE_BACKEND"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    if name != OnnxBackend.name:
+        kwargs.pop("onnx_path", None)
+    else:
+        kwargs.pop("compile_mode", None)
+    return BACKENDS[name](model, tokenizer, **kwargs)
+
+
+def warmup(predict, batch_sizes=(1, 8, 32), seq_lengths=(32, 128, 256), rounds=2):
+    """
+    Run synthetic batches of every size and sequence length through `predict`
+    (called as predict(texts, max_length=...)) so buffers are allocated and
+    kernels selected before real traffic. Returns the seconds taken.
+    """
+    start = time.perf_counter()
+    for length in seq_lengths:
+        # One BPE token per repeated word, truncated to exactly `length`
+        text = " ".join(["warmup"] * length)
+        for batch_size in batch_sizes:
+            for _ in range(rounds):
+                predict([text] * batch_size, max_length=length)
+    return time.perf_counter() - start
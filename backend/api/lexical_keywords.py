@@ -0,0 +1,188 @@
+"""
+Fast statistical keyword extraction, an alternative to KeyBERT.
+
+Candidates are the text's non-stopword words (and optionally n-grams),
+tokenized the same way as KeyBERT's default CountVectorizer. Each is scored
+by TF-IDF against document frequencies precomputed from the seeded
+`redditposts` and `newsarticles` tables, with a YAKE-style boost for terms
+that appear early (titles come first in the text we extract from).
+
+Build the IDF statistics once and reuse them:
+    python lexical_keywords.py build --output keyword_idf.json
+    python lexical_keywords.py build --csv ../database/data/unlabelled_data_clean.csv --output keyword_idf.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+import pandas as pd
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from sqlalchemy import create_engine, text, inspect
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+CORPUS_TABLES = ("redditposts", "newsarticles")
+
+
+def tokenize(text):
+    """Lowercased word tokens, matching CountVectorizer's default token pattern"""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def candidate_terms(tokens, ngram_range=(1, 1)):
+    """Yield (term, first_position) for n-grams that contain no stopwords or pure numbers"""
+    keep = [not (t in ENGLISH_STOP_WORDS or t.isdigit()) for t in tokens]
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        for i in range(len(tokens) - n + 1):
+            if all(keep[i:i + n]):
+                yield " ".join(tokens[i:i + n]), i
+
+
+class IDFStats:
+    """Document frequencies of candidate terms over a reference corpus"""
+
+    def __init__(self, documents=0, document_frequency=None, ngram_range=(1, 1)):
+        self.documents = documents
+        self.document_frequency = document_frequency or {}
+        self.ngram_range = tuple(ngram_range)
+
+    @classmethod
+    def build(cls, texts, ngram_range=(1, 1), min_df=2):
+        """Count, for every candidate term, how many texts contain it"""
+        counts = Counter()
+        documents = 0
+        for doc in texts:
+            documents += 1
+            counts.update({term for term, _ in candidate_terms(tokenize(doc), ngram_range)})
+
+        # Terms seen once carry no more information than unseen ones
+        frequency = {term: df for term, df in counts.items() if df >= min_df}
+        return cls(documents, frequency, ngram_range)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["documents"], data["document_frequency"], data.get("ngram_range", (1, 1)))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "documents": self.documents,
+                "ngram_range": list(self.ngram_range),
+                "document_frequency": self.document_frequency,
+            }, f)
+
+    def idf(self, term):
+        """Smoothed IDF; terms missing from the corpus count as seen in one document"""
+        df = self.document_frequency.get(term, 1)
+        return math.log((1 + self.documents) / (1 + df)) + 1
+
+    def __len__(self):
+        return len(self.document_frequency)
+
+
+def iter_table_texts(engine, tables=CORPUS_TABLES, chunk_size=5000):
+    """Stream "title body" texts from the seeded corpus tables"""
+    existing = set(inspect(engine).get_table_names())
+    for table in tables:
+        if table not in existing:
+            logger.warning("corpus table not found, skipping", extra={"table": table})
+            continue
+        query = text(f"SELECT title, body FROM {table}")
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(query)
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for title, body in rows:
+                    yield f"{title or ''} {body or ''}"
+
+
+def iter_csv_texts(paths, chunk_size=5000):
+    """Stream "title body" texts from CSVs with title/body columns"""
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=["title", "body"], chunksize=chunk_size):
+            titles = chunk["title"].fillna("").astype(str)
+            bodies = chunk["body"].fillna("").astype(str)
+            yield from (titles + " " + bodies)
+
+
+class LexicalKeywordExtractor:
+    """
+    TF-IDF keyword scorer with the same `extract_keywords` interface as KeyBERT.
+
+    score = (1 + log tf) * idf * (1 + 1 / (1 + first_position / position_scale))
+    """
+
+    def __init__(self, idf_stats, position_scale=10):
+        self.idf_stats = idf_stats
+        self.ngram_range = idf_stats.ngram_range
+        self.position_scale = position_scale
+
+    def extract_keywords(self, doc, top_n=5):
+        """Return [(keyword, score)] for the top_n highest scoring candidates"""
+        tf = Counter()
+        first_seen = {}
+        for term, position in candidate_terms(tokenize(doc), self.ngram_range):
+            tf[term] += 1
+            first_seen.setdefault(term, position)
+
+        scored = []
+        for term, count in tf.items():
+            position_weight = 1 + 1 / (1 + first_seen[term] / self.position_scale)
+            score = (1 + math.log(count)) * self.idf_stats.idf(term) * position_weight
+            scored.append((term, round(score, 4)))
+
+        scored.sort(key=lambda item: (-item[1], first_seen[item[0]]))
+        return scored[:top_n]
+
+
+def load_or_build_idf(path, engine, ngram_range=(1, 1)):
+    """Load IDF statistics from path, building them from the corpus tables if missing"""
+    try:
+        stats = IDFStats.load(path)
+        logger.info("loaded keyword IDF statistics", extra={"path": path, "terms": len(stats)})
+        return stats
+    except FileNotFoundError:
+        pass
+
+    logger.info("building keyword IDF statistics", extra={"tables": list(CORPUS_TABLES)})
+    stats = IDFStats.build(iter_table_texts(engine), ngram_range=ngram_range)
+    stats.save(path)
+    logger.info("saved keyword IDF statistics", extra={"path": path, "terms": len(stats), "documents": stats.documents})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Precompute IDF statistics")
+    build.add_argument("--output", default="./keyword_idf.json")
+    build.add_argument("--csv", nargs="+", help="Read title/body CSVs instead of the database")
+    build.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    build.add_argument("--max-ngram", type=int, default=1, help="Longest candidate n-gram")
+    build.add_argument("--min-df", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.csv:
+        texts = iter_csv_texts(args.csv)
+    else:
+        engine = create_engine(args.database_url or os.getenv("DATABASE_URL"))
+        texts = iter_table_texts(engine)
+
+    stats = IDFStats.build(texts, ngram_range=(1, args.max_ngram), min_df=args.min_df)
+    stats.save(args.output)
+    print(f"Saved {len(stats)} terms over {stats.documents} documents to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Levelled, structured logging for the API.
+
+Call sites log a short event message and pass fields through `extra`:
+
+    logger.info("related request", extra={"user_id": user_id, "label": leaning})
+
+LOG_FORMAT=text renders the fields as key=value pairs after the message;
+LOG_FORMAT=json emits one JSON object per line for log shippers. LOG_LEVEL
+(default INFO) controls verbosity: per-request detail is logged at DEBUG, so
+production can run at INFO or WARNING without paying for it.
+"""
+import json
+import logging
+import sys
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+
+
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        fields = " ".join(f"{key}={value!r}" for key, value in record_fields(record).items())
+        return f"{line} {fields}" if fields else line
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level="INFO", fmt="text"):
+    """Send all loggers to stdout at `level` using the text or JSON formatter"""
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(KeyValueFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
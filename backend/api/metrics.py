@@ -0,0 +1,105 @@
+"""
+Prometheus metrics for the API.
+
+Request counts and latencies are recorded per route template by the HTTP
+middleware in combined_api.py. Pipeline stages time themselves with
+`timed(stage)`:
+
+    tokenization        tokenizer calls and batch padding
+    model_forward       classifier / encoder forward passes
+    inference_pool      round trip through the inference worker processes
+    keyword_extraction  KeyBERT or lexical keyword extraction
+    reddit_search       Reddit search API calls (cache misses only)
+    index_search        local recommendation index lookups
+    db_write            write-behind flushes of user_activity
+
+The in-process stats already reported on /health (batcher, caches, pool,
+write-behind queue) are exported as gauges by StatsCollector at scrape time.
+"""
+import re
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "api_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "api_stage_duration_seconds", "Time spent per pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    "api_stage_errors_total", "Pipeline stage calls that raised", ["stage"]
+)
+BATCH_SIZE = Histogram(
+    "api_inference_batch_size", "Texts per model forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+SEQUENCE_LENGTH = Histogram(
+    "api_inference_sequence_length", "Tokens per text after truncation",
+    buckets=(8, 16, 32, 64, 128, 192, 256, 384, 512)
+)
+
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the enclosed block under `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+
+def observe_batch(lengths):
+    """Record one forward pass over texts with the given token lengths"""
+    BATCH_SIZE.observe(len(lengths))
+    for length in lengths:
+        SEQUENCE_LENGTH.observe(length)
+
+
+class StatsCollector:
+    """
+    Export numeric values of `stats()` dicts as gauges, read at scrape time.
+
+    Nested dicts are flattened with underscores, e.g. the pool's
+    `checked_out` becomes `api_db_pool_checked_out`.
+    """
+
+    def __init__(self, sources):
+        self.sources = sources
+
+    def _flatten(self, prefix, stats):
+        for key, value in stats.items():
+            name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{key}")
+            if isinstance(value, dict):
+                yield from self._flatten(name, value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield name, value
+
+    def collect(self):
+        for source, stats_fn in self.sources.items():
+            stats = stats_fn()
+            if not stats:
+                continue
+            for name, value in self._flatten(f"api_{source}", stats):
+                yield GaugeMetricFamily(name, f"{source} stat", value=value)
+
+
+def register_stats(sources):
+    """Register a StatsCollector for {name: stats_fn} on the default registry"""
+    REGISTRY.register(StatsCollector(sources))
+
+
+def render():
+    """Return (body, content type) for the /metrics endpoint"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
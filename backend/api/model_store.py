@@ -0,0 +1,120 @@
+"""
+Model artifact formats for the bias classifier.
+
+The preferred artifact is a directory written by `save_pretrained` holding
+`config.json`, `model.safetensors` and the tokenizer files. The weights are
+memory-mapped at load time and assigned directly into the model, so they are
+read lazily from the page cache and shared between every worker process on
+the host instead of being copied into each worker's heap.
+
+The original pickled {'model', 'tokenizer'} file is still supported as a
+fallback and can be converted once with:
+
+    python model_store.py convert ./bias_model.pkl ./bias_model
+"""
+import argparse
+import hashlib
+import os
+import pickle
+
+from safetensors.torch import load_file
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+from transformers.modeling_utils import no_init_weights
+
+SAFETENSORS_FILE = "model.safetensors"
+
+
+def load_pickle_artifact(path):
+    """Load the pickled {'model', 'tokenizer'} artifact produced by the training notebook"""
+    with open(path, 'rb') as f:
+        saved_data = pickle.load(f)
+    model = saved_data['model']
+    model.eval()
+    return model, saved_data['tokenizer']
+
+
+def is_safetensors_dir(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, SAFETENSORS_FILE))
+
+
+def convert_pickle_to_safetensors(pickle_path, model_dir):
+    """One-shot conversion of the pickle artifact into a safetensors model directory"""
+    model, tokenizer = load_pickle_artifact(pickle_path)
+    os.makedirs(model_dir, exist_ok=True)
+    model.save_pretrained(model_dir, safe_serialization=True)
+    tokenizer.save_pretrained(model_dir)
+    return model, tokenizer
+
+
+def load_safetensors_model(model_dir):
+    """
+    Build the model without initializing weights, then assign the mmap-backed
+    safetensors tensors as its parameters so no private copy is made.
+    """
+    config = AutoConfig.from_pretrained(model_dir)
+    with no_init_weights():
+        model = AutoModelForSequenceClassification.from_config(config)
+
+    state_dict = load_file(os.path.join(model_dir, SAFETENSORS_FILE), device="cpu")
+    missing, _ = model.load_state_dict(state_dict, strict=False, assign=True)
+
+    # Non-persistent buffers (e.g. position_ids) are rebuilt by the constructor,
+    # but every parameter must come from the file
+    parameter_names = {name for name, _ in model.named_parameters()}
+    missing_parameters = [name for name in missing if name in parameter_names]
+    if missing_parameters:
+        raise ValueError(f"Weights missing from {model_dir}: {missing_parameters}")
+
+    model.eval()
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return model, tokenizer
+
+
+def artifact_version(path, chunk_size=1 << 20):
+    """
+    Short fingerprint of the artifact at `path` (a directory or a single file)
+    from each file's relative name and bytes. It depends only on content, so
+    every replica that downloads or converts the same model gets the same
+    version and shares cached results, while retrained weights change it.
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+        )
+    else:
+        files = [path]
+
+    digest = hashlib.sha256()
+    for file_path in files:
+        name = os.path.relpath(file_path, path) if os.path.isdir(path) else ""
+        digest.update(f"{name}\x00{os.path.getsize(file_path)}\n".encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def load_model_artifact(path):
+    """Load (model, tokenizer) from a safetensors directory or a pickle file"""
+    if is_safetensors_dir(path):
+        return load_safetensors_model(path)
+    return load_pickle_artifact(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the pickled bias model to a safetensors directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="Convert a pickle artifact")
+    convert.add_argument("pickle_path", help="Path to bias_model.pkl")
+    convert.add_argument("model_dir", help="Output directory for config, weights and tokenizer")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        convert_pickle_to_safetensors(args.pickle_path, args.model_dir)
+        print(f"Converted {args.pickle_path} -> {args.model_dir}")
+        print("Upload with: aws s3 cp --recursive <model_dir> s3://<bucket>/bias_model/")
+
+
+if __name__ == "__main__":
+    main()
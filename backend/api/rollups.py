@@ -0,0 +1,166 @@
+"""
+Incrementally maintained user_activity rollups for the dashboard.
+
+    activity_rollup_hourly       posts and summed title length per
+                                 (hour, bias_label, subreddit)
+    activity_rollup_daily_users  one row per (day, bias_label, user_id), so
+                                 distinct users can be counted without the
+                                 raw activity table
+
+The API's write-behind flush applies each batch of inserted activity rows in
+the same transaction. Rows written by anything else can be folded in by the
+periodic rebuild:
+    python rollups.py rebuild --hours 48
+"""
+import argparse
+import logging
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    MetaData, Table, Column, String, Integer, BigInteger, DateTime, Date, create_engine, inspect, text
+)
+from sqlalchemy.dialects import mysql, sqlite
+
+logger = logging.getLogger(__name__)
+
+
+def hour_bucket(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def title_length(title):
+    """Title length in bytes, matching MySQL's LENGTH(title)"""
+    return len(title.encode("utf-8")) if title else 0
+
+
+class ActivityRollups:
+    """Hourly activity counts and daily active users, kept in step with user_activity"""
+
+    def __init__(self, engine, source_table="user_activity"):
+        self.engine = engine
+        self.source_table = source_table
+        self.metadata = MetaData()
+        self.hourly = Table(
+            "activity_rollup_hourly",
+            self.metadata,
+            Column("bucket_start", DateTime, primary_key=True),
+            Column("bias_label", String(50), primary_key=True),
+            Column("subreddit", String(255), primary_key=True),
+            Column("post_count", Integer, nullable=False, default=0),
+            Column("title_length_sum", BigInteger, nullable=False, default=0),
+        )
+        self.daily_users = Table(
+            "activity_rollup_daily_users",
+            self.metadata,
+            Column("bucket_date", Date, primary_key=True),
+            Column("bias_label", String(50), primary_key=True),
+            Column("user_id", String(255), primary_key=True),
+        )
+
+    def setup(self):
+        """Create the rollup tables, backfilling them from user_activity when first created"""
+        existing = set(inspect(self.engine).get_table_names())
+        self.metadata.create_all(bind=self.engine)
+        if self.hourly.name not in existing and self.source_table in existing:
+            logger.info("backfilling activity rollups", extra={"source": self.source_table})
+            self.rebuild()
+
+    def _upsert(self, table, rows, increments=None):
+        dialect = self.engine.dialect.name
+        if dialect == "mysql":
+            stmt = mysql.insert(table).values(rows)
+            if increments:
+                return stmt.on_duplicate_key_update(
+                    **{c: table.c[c] + stmt.inserted[c] for c in increments}
+                )
+            return stmt.prefix_with("IGNORE")
+        if dialect == "sqlite":
+            stmt = sqlite.insert(table).values(rows)
+            keys = [c.name for c in table.primary_key]
+            if increments:
+                return stmt.on_conflict_do_update(
+                    index_elements=keys, set_={c: table.c[c] + stmt.excluded[c] for c in increments}
+                )
+            return stmt.on_conflict_do_nothing(index_elements=keys)
+        raise ValueError(f"ActivityRollups does not support the {dialect} dialect")
+
+    def apply(self, conn, rows):
+        """Fold newly inserted user_activity rows into the rollups on an open connection"""
+        counts = Counter()
+        lengths = Counter()
+        users = set()
+        for row in rows:
+            timestamp = row.get("timestamp") or datetime.now()
+            label = row.get("bias_label") or ""
+            key = (hour_bucket(timestamp), label, row.get("subreddit") or "")
+            counts[key] += 1
+            lengths[key] += title_length(row.get("title"))
+            if row.get("user_id"):
+                users.add((timestamp.date(), label, row["user_id"]))
+
+        if counts:
+            conn.execute(self._upsert(self.hourly, [
+                {"bucket_start": bucket, "bias_label": label, "subreddit": subreddit,
+                 "post_count": count, "title_length_sum": lengths[(bucket, label, subreddit)]}
+                for (bucket, label, subreddit), count in counts.items()
+            ], increments=("post_count", "title_length_sum")))
+        if users:
+            conn.execute(self._upsert(self.daily_users, [
+                {"bucket_date": day, "bias_label": label, "user_id": user_id}
+                for day, label, user_id in users
+            ]))
+
+    def _hour_sql(self):
+        """SQL truncating user_activity.timestamp to its hour, stored like a DateTime value"""
+        if self.engine.dialect.name == "sqlite":
+            return "strftime('%Y-%m-%d %H:00:00.000000', timestamp)"
+        return "TIMESTAMP(DATE(timestamp), MAKETIME(HOUR(timestamp), 0, 0))"
+
+    def rebuild(self, since=None):
+        """Recompute the rollups from user_activity for whole hours/days from `since` (default: all)"""
+        since = since or datetime(1970, 1, 1)
+        hour = hour_bucket(since)
+        day = since.date()
+        params = {"hour": hour, "day": day}
+        with self.engine.begin() as conn:
+            conn.execute(self.hourly.delete().where(self.hourly.c.bucket_start >= hour))
+            conn.execute(self.daily_users.delete().where(self.daily_users.c.bucket_date >= day))
+            conn.execute(text(f"""
+                INSERT INTO {self.hourly.name} (bucket_start, bias_label, subreddit, post_count, title_length_sum)
+                SELECT {self._hour_sql()},
+                       COALESCE(bias_label, ''), COALESCE(subreddit, ''),
+                       COUNT(*), COALESCE(SUM(LENGTH(title)), 0)
+                FROM {self.source_table}
+                WHERE timestamp >= :hour
+                GROUP BY 1, 2, 3
+            """), params)
+            conn.execute(text(f"""
+                INSERT INTO {self.daily_users.name} (bucket_date, bias_label, user_id)
+                SELECT DISTINCT DATE(timestamp), COALESCE(bias_label, ''), user_id
+                FROM {self.source_table}
+                WHERE timestamp >= :day AND user_id IS NOT NULL
+            """), params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild", help="Recompute rollups from user_activity")
+    rebuild.add_argument("--hours", type=int, help="Only recompute the last N hours (default: everything)")
+    rebuild.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url or os.getenv("DATABASE_URL"))
+    rollups = ActivityRollups(engine)
+    rollups.metadata.create_all(bind=engine)
+
+    since = datetime.now() - timedelta(hours=args.hours) if args.hours else None
+    rollups.rebuild(since)
+    print(f"Rebuilt activity rollups{f' for the last {args.hours} hours' if args.hours else ''}")
+
+
+if __name__ == "__main__":
+    main()
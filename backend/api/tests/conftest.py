@@ -0,0 +1,39 @@
+import os
+import sys
+
+# The API modules are imported flat (`from cache import ...`), as in combined_api.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import MetaData, Table, Column, Integer, String, Text, Boolean, DateTime, BINARY, create_engine
+from sqlalchemy.sql import func
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}", connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def user_activity(engine):
+    """user_activity as defined in combined_api.py, created on the SQLite engine"""
+    metadata = MetaData()
+    table = Table(
+        'user_activity',
+        metadata,
+        Column('id', Integer, primary_key=True, autoincrement=True),
+        Column('user_id', String(255)),
+        Column('title', String(255)),
+        Column('title_hash', BINARY(16)),
+        Column('body', Text),
+        Column('bias_label', String(50)),
+        Column('subreddit', String(255)),
+        Column('threshold_reached', Boolean, default=False),
+        Column('recommendation_triggered', Boolean, default=False),
+        Column('recommended_post_urls', Text),
+        Column('timestamp', DateTime, default=func.now()),
+    )
+    metadata.create_all(engine)
+    return table
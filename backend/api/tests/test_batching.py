@@ -0,0 +1,155 @@
+import threading
+
+import pytest
+
+from batching import MicroBatcher, length_buckets
+from worker_pool import InferenceUnavailable
+
+
+def upper(texts):
+    return [text.upper() for text in texts]
+
+
+def test_runs_inline_before_start():
+    batcher = MicroBatcher(upper)
+    assert batcher.submit("a").result() == "A"
+    assert batcher.stats()["batches_run"] == 0
+
+
+def test_coalesces_concurrent_submissions():
+    calls = []
+    release = threading.Event()
+
+    def predict(texts):
+        calls.append(list(texts))
+        release.wait(1)
+        return upper(texts)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=50)
+    batcher.start()
+    try:
+        futures = batcher.submit_many(["a", "b", "c"])
+        release.set()
+        assert [future.result(timeout=1) for future in futures] == ["A", "B", "C"]
+    finally:
+        batcher.stop()
+
+    assert calls == [["a", "b", "c"]]
+    assert batcher.stats()["batch_size_histogram"] == {3: 1}
+
+
+def test_caps_batches_at_max_batch_size():
+    batcher = MicroBatcher(upper, max_batch_size=2, max_wait_ms=50)
+    batcher.start()
+    try:
+        futures = batcher.submit_many(["a", "b", "c", "d", "e"])
+        assert [future.result(timeout=1) for future in futures] == ["A", "B", "C", "D", "E"]
+    finally:
+        batcher.stop()
+
+    assert max(batcher.stats()["batch_size_histogram"]) <= 2
+
+
+def test_prediction_errors_reach_every_caller():
+    def fail(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher(fail, max_wait_ms=20)
+    batcher.start()
+    try:
+        futures = batcher.submit_many(["a", "b"])
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=1)
+    finally:
+        batcher.stop()
+
+
+def test_stop_drains_queued_requests():
+    batcher = MicroBatcher(upper, max_batch_size=1, max_wait_ms=0)
+    batcher.start()
+    futures = batcher.submit_many(["a", "b", "c"])
+    batcher.stop()
+    assert [future.result(timeout=1) for future in futures] == ["A", "B", "C"]
+
+
+def test_submit_after_stop_runs_inline():
+    batcher = MicroBatcher(upper)
+    batcher.start()
+    batcher.stop()
+    assert batcher.submit("a").result(timeout=1) == "A"
+    assert batcher.stats()["queue_depth"] == 0
+
+
+def test_stop_fails_requests_left_after_timeout():
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(texts):
+        started.set()
+        release.wait(2)
+        return upper(texts)
+
+    batcher = MicroBatcher(slow, max_batch_size=1, max_wait_ms=0)
+    batcher.start()
+    futures = batcher.submit_many(["a", "b", "c"])
+    assert started.wait(1)
+    batcher.stop(timeout=0.1)
+    release.set()
+
+    # "a" was already running; the rest were still queued when stop gave up
+    assert futures[0].result(timeout=1) == "A"
+    for future in futures[1:]:
+        with pytest.raises(InferenceUnavailable):
+            future.result(timeout=1)
+
+
+def test_length_buckets_respect_token_budget():
+    lengths = [10, 200, 12, 180, 11, 190]
+    buckets = length_buckets(lengths, max_tokens=400, max_batch_size=64)
+
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+    for bucket in buckets:
+        assert len(bucket) * max(lengths[i] for i in bucket) <= 400
+    # Sorted by length, so short and long items are never padded together
+    assert buckets[0] == [0, 4, 2]
+
+
+def test_length_buckets_respect_max_batch_size():
+    buckets = length_buckets([5] * 10, max_tokens=10000, max_batch_size=4)
+    assert [len(bucket) for bucket in buckets] == [4, 4, 2]
+
+
+def test_length_buckets_keep_oversized_items():
+    # An item longer than the budget still gets a bucket of its own
+    assert length_buckets([50, 1000], max_tokens=100) == [[0], [1]]
+    assert length_buckets([]) == []
+
+
+def test_consumers_run_batches_concurrently():
+    running = []
+    peak = []
+    lock = threading.Lock()
+    both_running = threading.Event()
+
+    def predict(texts):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+            if len(running) == 2:
+                both_running.set()
+        both_running.wait(1)
+        with lock:
+            running.pop()
+        return upper(texts)
+
+    batcher = MicroBatcher(predict, max_batch_size=1, max_wait_ms=0, consumers=2)
+    batcher.start()
+    try:
+        futures = batcher.submit_many(["a", "b"])
+        assert [future.result(timeout=2) for future in futures] == ["A", "B"]
+    finally:
+        batcher.stop()
+
+    assert max(peak) == 2
+    assert all(not thread.is_alive() for thread in batcher._threads)
@@ -0,0 +1,69 @@
+import time
+
+from cache import LRUTTLCache, SQLCacheBackend, ClassificationCache, normalize_text
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_expires_entries_after_ttl():
+    cache = LRUTTLCache(max_size=10, ttl_seconds=60)
+    cache.set("old", 1, stored_at=time.time() - 61)
+    cache.set("new", 2)
+
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert len(cache) == 1
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  a\tpost \n here ") == "a post here"
+    assert normalize_text(None) == ""
+
+
+def test_keys_depend_on_model_version_and_length():
+    cache = ClassificationCache("v1")
+    key = cache.make_key("a  post", 256)
+
+    assert key == cache.make_key("a post", 256)
+    assert key != cache.make_key("a post", 512)
+    assert key != ClassificationCache("v2").make_key("a post", 256)
+
+
+def test_shared_backend_fills_local_cache(tmp_path):
+    backend = SQLCacheBackend.from_path(tmp_path / "cache.db")
+    backend.create_table()
+    writer = ClassificationCache("v1", backend=backend)
+    writer.set("k1", {"label": "left", "confidence": 0.9})
+
+    reader = ClassificationCache("v1", backend=backend)
+    assert reader.get_many(["k1", "k2"]) == {"k1": {"label": "left", "confidence": 0.9}}
+    assert reader.local.get("k1") == {"label": "left", "confidence": 0.9}
+
+    # Upserts replace the stored value
+    writer.set("k1", {"label": "right", "confidence": 0.6})
+    assert backend.get_many(["k1"])["k1"][0] == {"label": "right", "confidence": 0.6}
+
+
+def test_shared_backend_skips_expired_rows(tmp_path):
+    backend = SQLCacheBackend.from_path(tmp_path / "cache.db")
+    backend.create_table()
+    backend.set_many({"k1": {"label": "neutral"}})
+
+    assert backend.get_many(["k1"], ttl=60)
+    time.sleep(0.02)
+    assert backend.get_many(["k1"], ttl=0.01) == {}
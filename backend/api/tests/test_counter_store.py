@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from counter_store import InMemoryCounterStore, SQLCounterStore, RedisCounterStore, WriteThroughCounterStore
+
+
+def redis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisCounterStore(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture(params=["memory", "sql", "redis", "sql+cache"])
+def store(request, engine):
+    if request.param == "memory":
+        store = InMemoryCounterStore()
+    elif request.param == "sql":
+        store = SQLCounterStore(engine)
+    elif request.param == "redis":
+        store = redis_store()
+    else:
+        store = WriteThroughCounterStore(SQLCounterStore(engine))
+    store.setup()
+    return store
+
+
+def test_counts_and_trips_once_at_threshold(store):
+    for _ in range(2):
+        assert store.increment_and_check("u1", "left", 3)[1] is None
+    store.increment_and_check("u1", "neutral", 3)
+    assert store.get_counts("u1") == {"left": 2, "right": 0}
+
+    counts, bias = store.increment_and_check("u1", "left", 3)
+    assert (counts, bias) == ({"left": 3, "right": 0}, "left")
+    # Counts reset after a trip
+    assert store.get_counts("u1") == {"left": 0, "right": 0}
+
+
+def test_users_are_counted_separately(store):
+    store.increment_and_check("u1", "right", 5)
+    store.increment_and_check("u2", "left", 5)
+    assert store.get_counts("u1") == {"left": 0, "right": 1}
+    assert store.get_counts("u2") == {"left": 1, "right": 0}
+    assert store.get_counts("unknown") == {"left": 0, "right": 0}
+
+
+def test_concurrent_increments_trip_exactly_once(engine):
+    store = SQLCounterStore(engine)
+    store.setup()
+    trips = []
+
+    def increment():
+        for _ in range(10):
+            trips.append(store.increment_and_check("u1", "left", 20)[1])
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert trips.count("left") == 2
+    assert store.get_counts("u1") == {"left": 0, "right": 0}
+
+
+def test_memory_store_evicts_beyond_max_users():
+    store = InMemoryCounterStore(max_users=2)
+    for user_id in ("u1", "u2", "u3"):
+        store.increment_and_check(user_id, "left", 5)
+    assert store.peek("u1") is None
+    assert store.stats()["evictions"] == 1
+
+
+def test_write_through_cache_expires_after_ttl(engine):
+    shared = SQLCounterStore(engine)
+    worker_a = WriteThroughCounterStore(shared, cache_ttl_seconds=0.05)
+    worker_b = WriteThroughCounterStore(shared, cache_ttl_seconds=0.05)
+    worker_a.setup()
+
+    worker_a.increment_and_check("u1", "left", 10)
+    worker_b.increment_and_check("u1", "left", 10)
+    # Worker A's cached count misses B's increment until the entry expires
+    assert worker_a.get_counts("u1") == {"left": 1, "right": 0}
+    time.sleep(0.06)
+    assert worker_a.get_counts("u1") == {"left": 2, "right": 0}
+
+
+def test_write_through_threshold_uses_shared_counts(engine):
+    shared = SQLCounterStore(engine)
+    worker_a = WriteThroughCounterStore(shared)
+    worker_b = WriteThroughCounterStore(shared)
+    worker_a.setup()
+
+    worker_a.increment_and_check("u1", "left", 2)
+    assert worker_b.increment_and_check("u1", "left", 2)[1] == "left"
@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+
+import dashboard_stats
+
+
+class RecordingConnection:
+    """Captures the SQL each stats query runs; the queries use MySQL date syntax"""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params):
+        self.statements.append((str(statement), params))
+        return []
+
+
+QUERIES = [
+    dashboard_stats.political_spectrum,
+    dashboard_stats.top_subreddits,
+    dashboard_stats.daily_activity,
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_all_user_stats_read_the_rollups(query):
+    conn = RecordingConnection()
+    query(conn)
+
+    sql, _ = conn.statements[0]
+    assert "activity_rollup_hourly" in sql
+    assert "FROM user_activity" not in sql
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_disabled_rollups_aggregate_user_activity(query):
+    conn = RecordingConnection()
+    query(conn, rollups=False)
+
+    sql, params = conn.statements[0]
+    assert "activity_rollup" not in sql
+    assert "FROM user_activity" in sql
+    assert "user_id = :user_id" not in sql
+    assert params["user_id"] is None
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_per_user_stats_filter_user_activity(query):
+    conn = RecordingConnection()
+    query(conn, user_id="u1")
+
+    sql, params = conn.statements[0]
+    assert "activity_rollup" not in sql
+    assert "WHERE user_id = :user_id AND timestamp" in sql
+    assert params["user_id"] == "u1"
+
+
+def test_json_default_converts_mysql_decimals():
+    assert dashboard_stats.json_default(Decimal("3")) == 3
+    assert dashboard_stats.json_default(Decimal("2.5")) == 2.5
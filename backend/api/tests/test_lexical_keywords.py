@@ -0,0 +1,57 @@
+import logging
+
+from sqlalchemy import text
+
+from lexical_keywords import IDFStats, LexicalKeywordExtractor, candidate_terms, load_or_build_idf, tokenize
+
+CORPUS = [
+    "The senate passed the budget bill",
+    "The senate debated immigration policy",
+    "Budget talks stall in the senate",
+    "Immigration policy protests continue",
+]
+
+
+def test_candidates_skip_stopwords_and_numbers():
+    tokens = tokenize("The 2024 election results are in")
+    assert [term for term, _ in candidate_terms(tokens)] == ["election", "results"]
+    assert ("election results", 2) in list(candidate_terms(tokens, ngram_range=(2, 2)))
+
+
+def test_idf_build_drops_rare_terms_and_round_trips(tmp_path):
+    stats = IDFStats.build(CORPUS, min_df=2)
+    assert stats.documents == 4
+    assert stats.document_frequency == {"senate": 3, "budget": 2, "immigration": 2, "policy": 2}
+
+    stats.save(tmp_path / "idf.json")
+    loaded = IDFStats.load(tmp_path / "idf.json")
+    assert loaded.document_frequency == stats.document_frequency
+    assert loaded.idf("unseen") > loaded.idf("budget") > loaded.idf("senate")
+
+
+def test_extractor_ranks_rare_terms_first():
+    extractor = LexicalKeywordExtractor(IDFStats.build(CORPUS, min_df=1))
+    keywords = [term for term, _ in extractor.extract_keywords("Senate protests over the budget", top_n=2)]
+    assert keywords == ["protests", "budget"]
+
+
+def test_load_or_build_idf_builds_from_tables_once(tmp_path, engine, caplog):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE redditposts (title TEXT, body TEXT)"))
+        for title in CORPUS:
+            conn.execute(text("INSERT INTO redditposts (title, body) VALUES (:title, '')"), {"title": title})
+
+    path = tmp_path / "idf.json"
+    with caplog.at_level(logging.INFO, logger="lexical_keywords"):
+        built = load_or_build_idf(path, engine)
+        loaded = load_or_build_idf(path, engine)
+
+    assert built.documents == loaded.documents == 4
+    messages = [record.getMessage() for record in caplog.records]
+    # newsarticles is missing from the test database
+    assert messages == [
+        "building keyword IDF statistics",
+        "corpus table not found, skipping",
+        "saved keyword IDF statistics",
+        "loaded keyword IDF statistics",
+    ]
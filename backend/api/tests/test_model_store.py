@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("safetensors")
+pytest.importorskip("transformers")
+
+from model_store import artifact_version
+
+
+def write_artifact(model_dir, weights=b"\x00\x01" * 64):
+    os.makedirs(os.path.join(model_dir, "tokenizer"))
+    with open(os.path.join(model_dir, "config.json"), "w") as f:
+        f.write('{"num_labels": 3}')
+    with open(os.path.join(model_dir, "model.safetensors"), "wb") as f:
+        f.write(weights)
+    with open(os.path.join(model_dir, "tokenizer", "vocab.txt"), "w") as f:
+        f.write("[PAD]\n[UNK]\n")
+
+
+def test_copies_of_the_same_artifact_share_a_version(tmp_path):
+    original = str(tmp_path / "replica-a" / "bias_model")
+    write_artifact(original)
+    copy = str(tmp_path / "replica-b" / "bias_model")
+    shutil.copytree(original, copy)
+    # A fresh download or conversion gets new modification times
+    os.utime(os.path.join(copy, "model.safetensors"), (0, 0))
+
+    assert artifact_version(original) == artifact_version(copy)
+
+
+def test_changed_weights_change_the_version(tmp_path):
+    original = str(tmp_path / "old")
+    write_artifact(original)
+    retrained = str(tmp_path / "new")
+    write_artifact(retrained, weights=b"\x00\x02" * 64)
+
+    assert artifact_version(original) != artifact_version(retrained)
+
+
+def test_single_file_artifact_ignores_its_name(tmp_path):
+    first = tmp_path / "bias_model.pkl"
+    first.write_bytes(b"pickle bytes")
+    second = tmp_path / "downloaded.pkl"
+    second.write_bytes(b"pickle bytes")
+
+    assert artifact_version(str(first)) == artifact_version(str(second))
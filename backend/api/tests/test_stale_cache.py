@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from cache import StaleWhileRevalidateCache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class Source:
+    """Fetch coroutine factory counting calls, with an optional delay"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def fetch(self, value):
+        async def fetch():
+            self.calls += 1
+            await asyncio.sleep(self.delay)
+            return value
+        return fetch
+
+
+def test_fresh_hit_does_not_fetch():
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl_seconds=60, stale_ttl_seconds=120)
+        source = Source()
+        assert await cache.get_or_fetch("k", source.fetch([1])) == [1]
+        assert await cache.get_or_fetch("k", source.fetch([2])) == [1]
+        return cache, source
+
+    cache, source = run(scenario())
+    assert source.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def scenario():
+        cache = StaleWhileRevalidateCache()
+        source = Source(delay=0.02)
+        results = await asyncio.gather(*[cache.get_or_fetch("k", source.fetch([1])) for _ in range(5)])
+        return results, source
+
+    results, source = run(scenario())
+    assert results == [[1]] * 5
+    assert source.calls == 1
+
+
+def test_stale_hit_serves_old_value_and_refreshes():
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl_seconds=0.01, stale_ttl_seconds=60)
+        source = Source()
+        await cache.get_or_fetch("k", source.fetch([1]))
+        await asyncio.sleep(0.02)
+        stale = await cache.get_or_fetch("k", source.fetch([2]))
+        await asyncio.sleep(0.01)
+        fresh = await cache.get_or_fetch("k", source.fetch([3]))
+        return stale, fresh, cache
+
+    stale, fresh, cache = run(scenario())
+    assert stale == [1]
+    assert fresh == [2]
+    assert cache.stats()["background_refreshes"] == 1
+
+
+def test_miss_during_slow_refresh_gets_fetched_value():
+    # The entry ages past stale_ttl while its background refresh is running;
+    # the next caller must get results, not the refresh task's None
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl_seconds=0.05, stale_ttl_seconds=0.2)
+        source = Source()
+        await cache.get_or_fetch("k", source.fetch([1]))
+        await asyncio.sleep(0.1)
+        slow = Source(delay=0.5)
+        assert await cache.get_or_fetch("k", slow.fetch([2])) == [1]
+        await asyncio.sleep(0.15)
+        return await cache.get_or_fetch("k", Source().fetch([3]))
+
+    assert run(scenario()) == [3]
+
+
+def test_failed_refresh_keeps_stale_value():
+    async def failing():
+        raise RuntimeError("reddit down")
+
+    async def scenario():
+        cache = StaleWhileRevalidateCache(ttl_seconds=0.01, stale_ttl_seconds=60)
+        await cache.get_or_fetch("k", Source().fetch([1]))
+        await asyncio.sleep(0.02)
+        assert await cache.get_or_fetch("k", failing) == [1]
+        await asyncio.sleep(0)
+        # The next stale hit retries the refresh
+        value = await cache.get_or_fetch("k", failing)
+        await asyncio.sleep(0)
+        return value, cache
+
+    value, cache = run(scenario())
+    assert value == [1]
+    assert cache.stats()["refresh_errors"] == 2
+
+
+def test_failed_fetch_raises_to_caller():
+    async def failing():
+        raise RuntimeError("reddit down")
+
+    cache = StaleWhileRevalidateCache()
+    with pytest.raises(RuntimeError):
+        run(cache.get_or_fetch("k", failing))
+    assert cache.stats()["fetching"] == 0
+
+
+def test_evicts_least_recently_used():
+    async def scenario():
+        cache = StaleWhileRevalidateCache(max_size=2)
+        for key in ("a", "b", "c"):
+            await cache.get_or_fetch(key, Source().fetch([key]))
+        return cache
+
+    cache = run(scenario())
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
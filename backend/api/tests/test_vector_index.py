@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("keybert")
+pytest.importorskip("safetensors")
+pytest.importorskip("transformers")
+
+from vector_index import VectorIndex, corpus_item, embed_corpus
+
+
+class FakeEncoder:
+    """Deterministic unit vectors per text; leaning from the text's last character"""
+
+    def classify_and_embed(self, texts, max_length=256, return_embeddings=False):
+        vectors = np.stack([
+            np.random.default_rng(sum(map(ord, text))).standard_normal(8) for text in texts
+        ]).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        probs = np.eye(3, dtype=np.float32)[[int(text[-1]) % 3 for text in texts]]
+        return probs, vectors
+
+
+def rows(n):
+    return [
+        {"title": f"post {i}", "body": "", "permalink": f"/r/news/comments/{i}/", "bias_text": None}
+        for i in range(n)
+    ]
+
+
+def test_corpus_item_builds_reddit_urls():
+    text, label, item = corpus_item({"title": "t", "permalink": "/r/politics/comments/1/", "bias_text": "Right"})
+    assert item == {"title": "t", "url": "https://www.reddit.com/r/politics/comments/1/", "subreddit": "politics"}
+    assert label == 2
+    assert corpus_item({"title": "no link"})[2]["url"] == ""
+
+
+def test_embed_corpus_skips_unlinkable_rows():
+    corpus = rows(5) + [{"title": "no link", "body": "anywhere"}]
+    vectors, labels, items = embed_corpus(FakeEncoder(), corpus, batch_size=2, chunk_size=3, expected_rows=2)
+
+    assert vectors.shape == (5, 8) and vectors.dtype == np.float16
+    assert len(labels) == len(items) == 5
+    assert all(item["url"] for item in items)
+
+
+def test_build_groups_vectors_and_search_finds_neighbours(tmp_path):
+    vectors, labels, items = embed_corpus(FakeEncoder(), rows(40), expected_rows=40)
+    index = VectorIndex.build(str(tmp_path), vectors, labels, items, n_clusters=4, chunk_size=7)
+
+    assert index.stats() == {"items": 40, "clusters": 4, "dimensions": 8}
+    assert sorted(item["title"] for item in index.items) == sorted(item["title"] for item in items)
+    # Every stored vector is one of the embedded ones, now grouped by cluster
+    assert sorted(map(tuple, np.asarray(index.vectors))) == sorted(map(tuple, vectors))
+
+    query = vectors[0].astype(np.float32)
+    results = index.search(query, k=3, nprobe=4)
+    assert len(results) == 3
+    assert all(result["title"] != items[0]["title"] for result in results)
@@ -0,0 +1,43 @@
+import pytest
+
+from worker_pool import InferenceWorkerPool, InferenceUnavailable, core_slices
+
+
+def test_core_slices_are_contiguous_and_near_equal():
+    assert core_slices(3, list(range(8))) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert core_slices(2, [4, 5, 6, 7]) == [[4, 5], [6, 7]]
+
+
+def test_core_slices_cap_workers_at_core_count():
+    assert core_slices(4, [0, 1]) == [[0], [1]]
+    assert core_slices(0, [0, 1]) == [[0, 1]]
+
+
+def pool(workers, min_chunk_size=8):
+    # Not started: only the batching logic is exercised
+    return InferenceWorkerPool("model", "torch", workers, min_chunk_size=min_chunk_size)
+
+
+def test_split_deals_texts_in_length_order(monkeypatch):
+    monkeypatch.setattr("worker_pool.available_cores", lambda: [0, 1, 2, 3])
+    texts = ["x" * n for n in (5, 1, 4, 2, 8, 3, 7, 6)]
+    chunks = pool(2, min_chunk_size=4).split(texts)
+
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(len(texts)))
+    # Alternating by length keeps the chunks' padded widths close
+    assert [[len(texts[i]) for i in chunk] for chunk in chunks] == [[1, 3, 5, 7], [2, 4, 6, 8]]
+
+
+def test_split_keeps_small_batches_whole(monkeypatch):
+    monkeypatch.setattr("worker_pool.available_cores", lambda: [0, 1, 2, 3])
+    assert pool(4).split(["a"] * 10) == [list(range(10))]
+    assert len(pool(4).split(["a"] * 40)) == 4
+
+
+def test_unstarted_pool_is_unavailable(monkeypatch):
+    monkeypatch.setattr("worker_pool.available_cores", lambda: [0, 1])
+    workers = pool(2)
+    assert not workers.ready
+    with pytest.raises(InferenceUnavailable):
+        workers.predict_proba(["text"])
+    assert workers.stats()["workers"] == 2
@@ -0,0 +1,136 @@
+import json
+import threading
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from write_behind import ActivityWriter, WriteQueueFull, hash_title
+
+
+def activity(user_id, title, label="left"):
+    return {"user_id": user_id, "title": title, "body": "", "bias_label": label, "subreddit": "politics"}
+
+
+def test_flush_inserts_and_marks_latest_row(engine, user_activity):
+    writer = ActivityWriter(engine, user_activity)
+    assert writer.flush([
+        ("insert", activity("u1", "First")),
+        ("insert", activity("u1", "First")),
+        ("insert", activity("u2", "Other")),
+    ])
+    assert writer.flush([("update", ("u1", "First", json.dumps(["https://reddit.com/a"])))])
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(user_activity.c.id, user_activity.c.title_hash, user_activity.c.recommended_post_urls)
+            .where(user_activity.c.user_id == "u1")
+            .order_by(user_activity.c.id)
+        ).fetchall()
+
+    assert [row.title_hash for row in rows] == [hash_title("First")] * 2
+    # Only the most recent row for the user/title gets the recommendation
+    assert [row.recommended_post_urls for row in rows] == [None, json.dumps(["https://reddit.com/a"])]
+    stats = writer.stats()
+    assert stats["rows_inserted"] == 3
+    assert stats["rows_updated"] == 1
+    assert stats["flushes"] == 2
+
+
+def test_background_thread_flushes_queue_on_stop(engine, user_activity):
+    writer = ActivityWriter(engine, user_activity, flush_size=2, flush_interval_ms=10)
+    writer.start()
+    for i in range(5):
+        writer.add_activity(activity("u1", f"Post {i}"))
+    writer.stop()
+
+    with engine.connect() as conn:
+        assert len(conn.execute(select(user_activity.c.id)).fetchall()) == 5
+    assert writer.stats()["queue_depth"] == 0
+
+
+def test_full_queue_rejects_writes(engine, user_activity):
+    writer = ActivityWriter(engine, user_activity, max_queue_size=1)
+    writer.add_activity(activity("u1", "A"))
+    with pytest.raises(WriteQueueFull):
+        writer.add_activity(activity("u1", "B"))
+    assert writer.stats()["rejected"] == 1
+
+
+class FlakyWriter(ActivityWriter):
+    """Fails the first `failures` transactions as a lost connection would"""
+
+    def __init__(self, *args, failures=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+
+    def _write(self, inserts, updates):
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError("INSERT", {}, Exception("Lost connection to MySQL server"))
+        return super()._write(inserts, updates)
+
+
+def test_failed_flush_is_retried(engine, user_activity):
+    writer = FlakyWriter(engine, user_activity, failures=2, max_retries=3, retry_backoff_ms=1)
+    assert writer.flush([("insert", activity("u1", "A"))])
+
+    with engine.connect() as conn:
+        assert len(conn.execute(select(user_activity.c.id)).fetchall()) == 1
+    stats = writer.stats()
+    assert stats["retries"] == 2
+    assert stats["failed"] == 0
+
+
+def test_batch_dropped_after_retries_run_out(engine, user_activity):
+    writer = FlakyWriter(engine, user_activity, failures=5, max_retries=2, retry_backoff_ms=1)
+    assert not writer.flush([("insert", activity("u1", "A")), ("insert", activity("u2", "B"))])
+
+    with engine.connect() as conn:
+        assert conn.execute(select(user_activity.c.id)).fetchall() == []
+    stats = writer.stats()
+    assert stats["retries"] == 2
+    assert stats["failed"] == 2
+
+
+def test_rows_after_stop_are_written_synchronously(engine, user_activity):
+    writer = ActivityWriter(engine, user_activity, flush_interval_ms=10)
+    writer.start()
+    writer.stop()
+    writer.add_activity(activity("u1", "Late"))
+
+    with engine.connect() as conn:
+        assert len(conn.execute(select(user_activity.c.id)).fetchall()) == 1
+    assert writer.stats()["queue_depth"] == 0
+
+
+class BlockedWriter(ActivityWriter):
+    """Holds every transaction until `release` is set"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _write(self, inserts, updates):
+        self.started.set()
+        self.release.wait(2)
+        return super()._write(inserts, updates)
+
+
+def test_stop_timeout_drops_and_counts_queued_rows(engine, user_activity):
+    writer = BlockedWriter(engine, user_activity, flush_size=1, flush_interval_ms=10)
+    writer.start()
+    for i in range(4):
+        writer.add_activity(activity("u1", f"Post {i}"))
+    assert writer.started.wait(1)
+    writer.stop(timeout=0.1)
+    writer.release.set()
+    writer._thread.join(1)
+
+    with engine.connect() as conn:
+        # Only the row already being written when stop gave up
+        assert len(conn.execute(select(user_activity.c.id)).fetchall()) == 1
+    stats = writer.stats()
+    assert stats["failed"] == 3
+    assert stats["queue_depth"] == 0
@@ -0,0 +1,284 @@
+"""
+Local nearest-neighbour index over the seeded corpus for counter-recommendations.
+
+Every row of `redditposts` and `newsarticles` is embedded with the bias
+classifier's encoder (the same pass also labels rows that have no `bias_text`)
+and stored as:
+
+    vectors.npy   float16 embeddings, grouped by cluster, memory-mapped at load
+    labels.npy    int8 leaning per row (0=left, 1=neutral, 2=right)
+    centroids.npy float32 IVF cluster centroids
+    offsets.npy   start row of each cluster in vectors.npy
+    items.jsonl   title / url / subreddit per row
+
+Search is an inverted-file (IVF) scan: the query is compared with every
+centroid and only the `nprobe` closest clusters are scanned.
+
+Build it with the model the API serves:
+    python vector_index.py build --model ./bias_model --output ./vector_index
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from sqlalchemy import create_engine, text, inspect
+
+from embeddings import SharedEncoder
+from lexical_keywords import CORPUS_TABLES
+from model_store import load_model_artifact
+
+LEANINGS = ("left", "neutral", "right")
+SOURCE_LABELS = {"left": 0, "center": 1, "neutral": 1, "right": 2}
+
+
+def iter_corpus_rows(engine, tables=CORPUS_TABLES, chunk_size=1000):
+    """Stream rows of the seeded corpus tables as dicts"""
+    existing = set(inspect(engine).get_table_names())
+    for table in tables:
+        if table not in existing:
+            print(f"Table '{table}' not found, skipping")
+            continue
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(f"SELECT * FROM {table}"))
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row._mapping)
+
+
+def count_corpus_rows(engine, tables=CORPUS_TABLES):
+    """Rows in the corpus tables that exist, used to size the embedding array up front"""
+    existing = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        return sum(
+            conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+            for table in tables if table in existing
+        )
+
+
+def corpus_item(row):
+    """
+    Text to embed, known leaning (or None) and display fields for a corpus row.
+    The url is empty when the row has neither a url nor a permalink; such rows
+    cannot be recommended and are left out of the index.
+    """
+    title = str(row.get("title") or "")
+    body = str(row.get("body") or "")
+    permalink = row.get("permalink") or ""
+    url = row.get("url") or (f"https://www.reddit.com{permalink}" if permalink else "")
+
+    subreddit = row.get("subreddit") or ""
+    if not subreddit and permalink.startswith("/r/"):
+        subreddit = permalink.split("/")[2]
+
+    label = SOURCE_LABELS.get(str(row.get("bias_text") or "").strip().lower())
+    item = {"title": title, "url": url, "subreddit": subreddit}
+    return f"{title} {body}".strip(), label, item
+
+
+def spherical_kmeans(vectors, n_clusters, iterations=10, sample_size=50000, seed=0):
+    """Cluster unit vectors by cosine similarity; returns unit-norm centroids"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = (vectors @ centroids.T).argmax(axis=1)
+        for c in range(n_clusters):
+            members = vectors[assignment == c]
+            # Reseed empty clusters from a random point
+            centroid = members.sum(axis=0) if len(members) else vectors[rng.integers(len(vectors))]
+            centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+    return centroids
+
+
+class VectorIndex:
+    """Memory-mapped IVF index of corpus embeddings with per-row leaning labels"""
+
+    FILES = ("vectors.npy", "labels.npy", "centroids.npy", "offsets.npy", "items.jsonl")
+
+    def __init__(self, vectors, labels, centroids, offsets, items):
+        self.vectors = vectors
+        self.labels = labels
+        self.centroids = centroids
+        self.offsets = offsets
+        self.items = items
+
+    @classmethod
+    def exists(cls, path):
+        return all(os.path.exists(os.path.join(path, name)) for name in cls.FILES)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "items.jsonl")) as f:
+            items = [json.loads(line) for line in f]
+        return cls(
+            np.load(os.path.join(path, "vectors.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "labels.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "centroids.npy")),
+            np.load(os.path.join(path, "offsets.npy")),
+            items,
+        )
+
+    @classmethod
+    def build(cls, path, vectors, labels, items, n_clusters=None, iterations=10, chunk_size=10000):
+        """
+        Cluster the embeddings, write them grouped by cluster and return the
+        loaded index. Vectors are kept in float16 (as stored) and only cast to
+        float32 `chunk_size` rows at a time, so the build needs about one copy
+        of the stored array in memory.
+        """
+        vectors = np.asarray(vectors, dtype=np.float16)
+        labels = np.asarray(labels, dtype=np.int8)
+        n_clusters = n_clusters or max(1, int(np.sqrt(len(vectors))))
+        n_clusters = min(n_clusters, len(vectors))
+
+        centroids = spherical_kmeans(vectors, n_clusters, iterations=iterations)
+        assignment = np.concatenate([
+            (vectors[i:i + chunk_size].astype(np.float32) @ centroids.T).argmax(axis=1)
+            for i in range(0, len(vectors), chunk_size)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(n_clusters + 1))
+
+        os.makedirs(path, exist_ok=True)
+        grouped = np.lib.format.open_memmap(
+            os.path.join(path, "vectors.npy"), mode="w+", dtype=np.float16, shape=vectors.shape
+        )
+        for i in range(0, len(order), chunk_size):
+            grouped[i:i + chunk_size] = vectors[order[i:i + chunk_size]]
+        grouped.flush()
+        del grouped
+        np.save(os.path.join(path, "labels.npy"), labels[order])
+        np.save(os.path.join(path, "centroids.npy"), centroids)
+        np.save(os.path.join(path, "offsets.npy"), offsets.astype(np.int64))
+        with open(os.path.join(path, "items.jsonl"), "w") as f:
+            for i in order:
+                f.write(json.dumps(items[i]) + "\n")
+        return cls.load(path)
+
+    def search(self, query, k=2, leaning=None, nprobe=8, max_similarity=0.999):
+        """
+        Return up to k items closest to the unit-norm query, optionally with one
+        leaning. Near-identical items (the query post itself) are skipped.
+        """
+        query = np.asarray(query, dtype=np.float32)
+        nprobe = min(nprobe, len(self.centroids))
+        clusters = np.argsort(self.centroids @ query)[::-1][:nprobe]
+        label = LEANINGS.index(leaning) if leaning else None
+
+        candidates = []
+        for c in clusters:
+            start, end = self.offsets[c], self.offsets[c + 1]
+            if start == end:
+                continue
+            rows = np.arange(start, end)
+            if label is not None:
+                rows = rows[np.asarray(self.labels[start:end]) == label]
+                if not len(rows):
+                    continue
+            scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+            candidates.extend(zip(scores.tolist(), rows.tolist()))
+
+        candidates.sort(reverse=True)
+        results = []
+        for score, row in candidates:
+            if score >= max_similarity:
+                continue
+            results.append(dict(self.items[row], leaning=LEANINGS[self.labels[row]], similarity=round(score, 4)))
+            if len(results) == k:
+                break
+        return results
+
+    def stats(self):
+        return {
+            "items": len(self.items),
+            "clusters": len(self.centroids),
+            "dimensions": int(self.vectors.shape[1]) if len(self.vectors) else 0,
+        }
+
+
+def embed_corpus(encoder, rows, batch_size=32, chunk_size=1024, max_length=256, expected_rows=0):
+    """
+    Embed corpus rows, labelling rows without a source label with the
+    classifier. Each batch is written into one float16 array sized for
+    `expected_rows` (doubled if the corpus turns out larger), rather than
+    collecting per-batch arrays and stacking them at the end.
+    """
+    vectors = None
+    labels, items = [], []
+    chunk = []
+    skipped = 0
+
+    def flush():
+        nonlocal vectors
+        # Sorting by length keeps padding low within each batch
+        chunk.sort(key=lambda entry: len(entry[0]))
+        for i in range(0, len(chunk), batch_size):
+            batch = chunk[i:i + batch_size]
+            probs, embeddings = encoder.classify_and_embed(
+                [t for t, _, _ in batch], max_length=max_length, return_embeddings=True
+            )
+            start, end = len(items), len(items) + len(batch)
+            if vectors is None:
+                vectors = np.empty((max(expected_rows, end), embeddings.shape[1]), dtype=np.float16)
+            elif end > len(vectors):
+                vectors = np.resize(vectors, (max(end, 2 * len(vectors)), vectors.shape[1]))
+            vectors[start:end] = embeddings
+            for (_, label, item), row_probs in zip(batch, probs):
+                labels.append(label if label is not None else int(row_probs.argmax()))
+                items.append(item)
+        print(f"Embedded {len(items)} rows")
+        chunk.clear()
+
+    for row in rows:
+        entry = corpus_item(row)
+        if not entry[0]:
+            continue
+        if not entry[2]["url"]:
+            skipped += 1
+            continue
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    if skipped:
+        print(f"Skipped {skipped} rows with no url or permalink")
+
+    if vectors is None:
+        return np.empty((0, 0), dtype=np.float16), labels, items
+    return vectors[:len(items)], labels, items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Embed the seeded corpus and write the index")
+    build.add_argument("--model", default="./bias_model", help="Safetensors model directory or pickle file")
+    build.add_argument("--output", default="./vector_index")
+    build.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    build.add_argument("--clusters", type=int, help="IVF clusters (default sqrt of row count)")
+    build.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    model, tokenizer = load_model_artifact(args.model)
+    # Every row is embedded once, so there is nothing to gain from a large cache
+    encoder = SharedEncoder(model, tokenizer, cache_size=args.batch_size)
+    engine = create_engine(args.database_url or os.getenv("DATABASE_URL"))
+
+    vectors, labels, items = embed_corpus(
+        encoder, iter_corpus_rows(engine), batch_size=args.batch_size, expected_rows=count_corpus_rows(engine)
+    )
+    index = VectorIndex.build(args.output, vectors, labels, items, n_clusters=args.clusters)
+    print(f"Wrote {index.stats()} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
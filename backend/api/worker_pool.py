@@ -0,0 +1,256 @@
+"""
+Multi-process inference pool for the API.
+
+Each worker process pins itself to its own slice of the available CPU cores,
+sets torch's intra-op threads to the size of that slice, loads the model and
+builds the configured inference backend, then reports ready on a queue.
+
+With the safetensors artifact the weights are memory-mapped (model_store.py),
+so on the eager `torch` backend every worker maps the same page-cache pages
+instead of holding a private copy. The other backends rewrite the weights as
+they build: `torch-int8` quantizes them, MODEL_COMPILE=torchscript freezes
+them into constants and ONNX Runtime loads its own copy. There each worker
+holds a private copy and memory grows with the worker count.
+
+The HTTP process queues classification batches to the pool. Several batches
+run at once, one per worker (combined_api.py runs one micro-batcher consumer
+per worker), and a batch large enough to be worth splitting is dealt across
+the workers. If a worker dies, the pool is replaced in the background and
+calls fail with InferenceUnavailable until the new workers are up.
+
+Workers are spawned, so each one imports only this module (torch and the
+model are loaded in init_worker) plus the parent's main module. Start the API
+with `uvicorn combined_api:app` (or `python combined_api.py`, which hands over
+to it) so that main module is uvicorn's CLI rather than the API itself.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Empty
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceUnavailable(Exception):
+    """Raised while the worker pool is starting or being replaced after a crash"""
+
+
+# --- WORKER PROCESS ---
+_backend = None
+_cores = None
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_slices(workers, cores=None):
+    """Split the cores into `workers` contiguous, near-equal slices"""
+    cores = cores if cores is not None else available_cores()
+    workers = max(1, min(workers, len(cores)))
+    size, extra = divmod(len(cores), workers)
+    slices, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(cores[start:end])
+        start = end
+    return slices
+
+
+def init_worker(slots, ready, model_path, backend_name, threads, backend_kwargs, warmup_kwargs):
+    """Pin to a free core slice, load and warm the model, then report on the `ready` queue"""
+    global _backend, _cores
+    try:
+        import torch
+        from inference import load_backend, warmup
+        from model_store import load_model_artifact
+
+        _cores = slots.get()
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, _cores)
+        torch.set_num_threads(threads or len(_cores))
+        torch.set_num_interop_threads(1)
+
+        model, tokenizer = load_model_artifact(model_path)
+        _backend = load_backend(backend_name, model, tokenizer, **backend_kwargs)
+        if warmup_kwargs is not None:
+            warmup(_backend.predict_proba, **warmup_kwargs)
+    except Exception as e:
+        ready.put({"pid": os.getpid(), "error": f"{type(e).__name__}: {e}"})
+        raise
+    ready.put({"pid": os.getpid(), "cores": _cores, "threads": torch.get_num_threads()})
+
+
+def spawn():
+    """No-op task; submitting one per worker makes the executor start every process"""
+
+
+def predict_chunk(texts, max_length):
+    return _backend.predict_proba(texts, max_length=max_length).numpy()
+
+
+class InferenceWorkerPool:
+    """
+    Process pool exposing the same `predict_proba` as an inference backend.
+
+    When a worker dies the executor is broken for good, so the pool calls
+    `on_broken` (default: `restart`) once on a background thread and fails
+    calls with InferenceUnavailable until a new executor has started.
+    """
+
+    def __init__(self, model_path, backend_name, workers, threads_per_worker=0,
+                 backend_kwargs=None, warmup_kwargs=None, min_chunk_size=8, on_broken=None):
+        self.model_path = model_path
+        self.backend_name = backend_name
+        self.slices = core_slices(workers)
+        self.workers = len(self.slices)
+        self.threads_per_worker = threads_per_worker
+        self.backend_kwargs = backend_kwargs or {}
+        self.warmup_kwargs = warmup_kwargs
+        self.min_chunk_size = min_chunk_size
+        self.on_broken = on_broken or self.restart
+
+        # Spawned, not forked: the HTTP process already runs threads and torch
+        self._context = multiprocessing.get_context("spawn")
+        self._pool = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self.worker_info = []
+        self.calls = 0
+        self.chunks = 0
+        self.texts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.restarts = 0
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def start(self, timeout=900):
+        """Spawn every worker and wait until each reports it has loaded (and warmed) the model"""
+        slots = self._context.Queue()
+        ready = self._context.Queue()
+        for cores in self.slices:
+            slots.put(cores)
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=self._context,
+            initializer=init_worker,
+            initargs=(slots, ready, self.model_path, self.backend_name, self.threads_per_worker,
+                      self.backend_kwargs, self.warmup_kwargs)
+        )
+        for _ in range(self.workers):
+            pool.submit(spawn)
+
+        infos = []
+        deadline = time.monotonic() + timeout
+        try:
+            while len(infos) < self.workers:
+                remaining = deadline - time.monotonic()
+                try:
+                    info = ready.get(timeout=max(remaining, 0))
+                except Empty:
+                    raise TimeoutError(f"Only {len(infos)} of {self.workers} inference workers started") from None
+                if "error" in info:
+                    raise RuntimeError(f"Inference worker {info['pid']} failed to start: {info['error']}")
+                infos.append(info)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+        with self._lock:
+            self._pool = pool
+            self.worker_info = sorted(infos, key=lambda info: info["cores"])
+            self._ready = True
+
+    def restart(self, timeout=900):
+        """Replace the executor with freshly started workers"""
+        with self._lock:
+            old, self._pool = self._pool, None
+            self._ready = False
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=True)
+        self.start(timeout=timeout)
+        with self._lock:
+            self.restarts += 1
+        logger.info("inference workers restarted", extra={"workers": self.workers, "restarts": self.restarts})
+
+    def _broken(self, pool, error):
+        """Start one background replacement per broken executor"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self._ready = False
+        logger.error("inference worker died, restarting the pool", extra={"error": str(error)})
+        pool.shutdown(wait=False, cancel_futures=True)
+        threading.Thread(target=self.on_broken, name="inference-pool-restart", daemon=True).start()
+
+    def split(self, texts):
+        """Deal texts, in length order, across up to one chunk per worker"""
+        chunks = min(self.workers, max(1, len(texts) // self.min_chunk_size))
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        return [order[i::chunks] for i in range(chunks)]
+
+    def predict_proba(self, texts, max_length=256):
+        pool = self._pool
+        if pool is None:
+            raise InferenceUnavailable("Inference workers are starting")
+
+        import torch
+
+        if not texts:
+            return torch.empty((0, 0))
+
+        chunks = self.split(texts)
+        with self._lock:
+            self.calls += 1
+            self.chunks += len(chunks)
+            self.texts += len(texts)
+            self.in_flight += len(chunks)
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            futures = [pool.submit(predict_chunk, [texts[i] for i in chunk], max_length) for chunk in chunks]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool as e:
+            self._broken(pool, e)
+            raise InferenceUnavailable("Inference workers are restarting") from e
+        finally:
+            with self._lock:
+                self.in_flight -= len(chunks)
+
+        probs = np.empty((len(texts), results[0].shape[1]), dtype=results[0].dtype)
+        for chunk, result in zip(chunks, results):
+            probs[chunk] = result
+        return torch.from_numpy(probs)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._ready = False
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "workers": self.workers,
+                "worker_cores": [info["cores"] for info in self.worker_info],
+                "threads_per_worker": [info["threads"] for info in self.worker_info],
+                "calls": self.calls,
+                "chunks": self.chunks,
+                "texts": self.texts,
+                "in_flight_chunks": self.in_flight,
+                "max_in_flight_chunks": self.max_in_flight,
+                "restarts": self.restarts,
+            }
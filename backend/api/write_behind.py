@@ -0,0 +1,256 @@
+import hashlib
+import logging
+import threading
+import time
+from queue import Queue, Empty, Full
+
+from sqlalchemy import select, func, bindparam, tuple_
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+def hash_title(title):
+    """16-byte MD5 of the title, matching UNHEX(MD5(title)) in MySQL"""
+    if title is None:
+        return None
+    return hashlib.md5(title.encode("utf-8")).digest()
+
+
+class WriteQueueFull(Exception):
+    """Raised when the write-behind queue is at capacity"""
+
+
+class ActivityWriter:
+    """
+    Write-behind buffer for user_activity.
+
+    Request handlers enqueue activity rows and recommendation updates and
+    return immediately. A background thread flushes the queue whenever
+    `flush_size` items are pending or `flush_interval_ms` has passed: inserts
+    go out as one multi-row INSERT, then recommendation updates are resolved to
+    row ids with a single SELECT and applied with one batched UPDATE. The queue
+    is bounded; when it is full `add_*` raise WriteQueueFull so callers can shed
+    load instead of growing memory. If `rollups` is given, inserted rows are
+    folded into it in the same transaction.
+
+    The rows were already acknowledged to clients, so a failed flush (deadlock,
+    lost connection, database restart) is retried up to `max_retries` times
+    with exponential backoff from `retry_backoff_ms` before the batch is
+    dropped and counted under `failed`.
+
+    Rows queued before `start()` are written once the thread runs. Rows
+    submitted after `stop()` are written synchronously, since the final flush
+    has already run; rows still queued when `stop()` times out are dropped,
+    logged and counted under `failed`.
+    """
+
+    def __init__(self, engine, table, flush_size=200, flush_interval_ms=1000, max_queue_size=10000, rollups=None,
+                 max_retries=3, retry_backoff_ms=200):
+        self.engine = engine
+        self.table = table
+        self.rollups = rollups
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000.0
+        self._queue = Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._running = False
+        self._stopped = False
+        self._lock = threading.Lock()
+
+        self._update_stmt = table.update().where(
+            table.c.id == bindparam("row_id")
+        ).values(
+            threshold_reached=True,
+            recommendation_triggered=True,
+            recommended_post_urls=bindparam("urls")
+        )
+
+        # Metrics
+        self.flushes = 0
+        self.rows_inserted = 0
+        self.rows_updated = 0
+        self.rejected = 0
+        self.failed = 0
+        self.retries = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        """Flush everything still queued and stop the writer thread"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._stopped = True
+        self._thread.join(timeout=timeout)
+        if not self._thread.is_alive():
+            return
+
+        # Take what the thread did not reach, so it is not half-written after we report it
+        dropped = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Empty:
+                break
+            dropped += 1
+        with self._lock:
+            self.failed += dropped
+        logger.error("write-behind writer did not finish before shutdown, dropping queued rows", extra={
+            "dropped": dropped,
+            "timeout_seconds": timeout
+        })
+
+    def _enqueue(self, item):
+        # Checked under the lock so nothing is queued after the final flush
+        with self._lock:
+            stopped = self._stopped
+            if not stopped:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except Full:
+                    self.rejected += 1
+                    raise WriteQueueFull("user_activity write queue is full")
+        self.flush([item])
+
+    def add_activity(self, values):
+        """Queue one user_activity row for insertion"""
+        self._enqueue(("insert", values))
+
+    def mark_recommendation(self, user_id, title, recommended_urls_json):
+        """Queue a recommendation update for the most recent user/title row"""
+        self._enqueue(("update", (user_id, title, recommended_urls_json)))
+
+    def _collect(self):
+        """Wait until flush_size items are queued or the flush interval passes"""
+        items = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(items) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return items
+
+    def _run(self):
+        while self._running:
+            items = self._collect()
+            if items:
+                self.flush(items)
+
+        # Flush on shutdown
+        while not self._queue.empty():
+            items = []
+            while len(items) < self.flush_size and not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            self.flush(items)
+
+    def flush(self, items):
+        """Write a batch of queued inserts and updates in one transaction, retrying on errors"""
+        inserts = [
+            dict(values, title_hash=hash_title(values.get("title")))
+            for kind, values in items if kind == "insert"
+        ]
+
+        # Only the latest update per user/title matters; match on the indexed title hash
+        updates = {}
+        for kind, payload in items:
+            if kind == "update":
+                user_id, title, urls = payload
+                updates[(user_id, hash_title(title))] = urls
+
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with timed("db_write"):
+                    updated = self._write(inserts, updates)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("write-behind flush failed, dropping batch", extra={
+                        "dropped": len(items),
+                        "attempts": attempt + 1,
+                        "error": str(e)
+                    })
+                    with self._lock:
+                        self.failed += len(items)
+                    return False
+                # The transaction rolled back, so the whole batch is retried
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning("write-behind flush failed, retrying", extra={
+                    "items": len(items),
+                    "attempt": attempt + 1,
+                    "retry_in_seconds": delay,
+                    "error": str(e)
+                })
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.flushes += 1
+            self.rows_inserted += len(inserts)
+            self.rows_updated += updated
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+        return True
+
+    def _write(self, inserts, updates):
+        """Apply one batch in a single transaction; returns the number of rows updated"""
+        with self.engine.begin() as conn:
+            if inserts:
+                conn.execute(self.table.insert(), inserts)
+                if self.rollups is not None:
+                    self.rollups.apply(conn, inserts)
+
+            if not updates:
+                return 0
+            # Resolve each user/title pair to its most recent row in one query
+            latest = conn.execute(
+                select(self.table.c.user_id, self.table.c.title_hash, func.max(self.table.c.id))
+                .where(tuple_(self.table.c.user_id, self.table.c.title_hash).in_(list(updates)))
+                .group_by(self.table.c.user_id, self.table.c.title_hash)
+            ).fetchall()
+            params = [
+                {"row_id": row_id, "urls": updates[(user_id, title_hash)]}
+                for user_id, title_hash, row_id in latest
+            ]
+            if params:
+                conn.execute(self._update_stmt, params)
+            return len(params)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_size": self._queue.maxsize,
+                "flushes": self.flushes,
+                "rows_inserted": self.rows_inserted,
+                "rows_updated": self.rows_updated,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "retries": self.retries,
+                "last_flush_ms": round(self.last_flush_ms, 2),
+                "max_flush_ms": round(self.max_flush_ms, 2),
+                "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            }
@@ -0,0 +1,202 @@
+"""
+Check that the dashboard and recommendation queries use their indexes.
+
+The global dashboard aggregates read the activity rollup tables (maintained by
+backend/api/rollups.py) through their primary keys; the per-user views and the
+recommendation update read user_activity through its secondary indexes. The
+queries below mirror backend/api/dashboard_stats.py and write_behind.py.
+
+Runs EXPLAIN for each query and fails if the expected index is not usable. On
+small tables MySQL may still prefer a full scan, so a different chosen key is
+only treated as a failure once the table has at least --min-rows rows. Tables
+that do not exist yet (the API creates the rollups on startup) are skipped.
+
+Usage:
+    python check_indexes.py [--min-rows 10000]
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import create_engine, text, inspect
+
+
+db_host = os.getenv("DB_HOST", "database")
+db_user = os.getenv("DB_USER", "root")
+db_password = os.getenv("DB_PASSWORD", "root")
+db_name = os.getenv("DB_NAME", "mydatabase")
+db_port = os.getenv("DB_PORT", "3306")
+
+engine_str = f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+ROLLUP_SPECTRUM = """
+    SELECT posts.bias_label, posts.post_count, COALESCE(users.unique_users, 0) as unique_users
+    FROM (
+        SELECT bias_label, SUM(post_count) as post_count
+        FROM activity_rollup_hourly
+        WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL :days DAY)
+        GROUP BY bias_label
+    ) posts
+    LEFT JOIN (
+        SELECT bias_label, COUNT(DISTINCT user_id) as unique_users
+        FROM activity_rollup_daily_users
+        WHERE bucket_date >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+        GROUP BY bias_label
+    ) users ON users.bias_label = posts.bias_label
+    ORDER BY posts.post_count DESC
+"""
+
+# (description, table, query, params, expected index)
+QUERIES = [
+    (
+        "dashboard: political spectrum (posts)",
+        "activity_rollup_hourly",
+        ROLLUP_SPECTRUM,
+        {"days": 30},
+        "PRIMARY",
+    ),
+    (
+        "dashboard: political spectrum (unique users)",
+        "activity_rollup_daily_users",
+        ROLLUP_SPECTRUM,
+        {"days": 30},
+        "PRIMARY",
+    ),
+    (
+        "dashboard: top subreddits",
+        "activity_rollup_hourly",
+        """
+        SELECT subreddit, SUM(post_count) as post_count,
+               SUM(title_length_sum) / SUM(post_count) as avg_title_length
+        FROM activity_rollup_hourly
+        WHERE bucket_start >= DATE_SUB(NOW(), INTERVAL :days DAY)
+        GROUP BY subreddit
+        ORDER BY post_count DESC
+        LIMIT :limit
+        """,
+        {"days": 30, "limit": 5},
+        "PRIMARY",
+    ),
+    (
+        "dashboard: daily activity",
+        "activity_rollup_hourly",
+        """
+        SELECT DATE(bucket_start) as day, SUM(post_count) as post_count
+        FROM activity_rollup_hourly
+        WHERE bucket_start >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+        GROUP BY day
+        ORDER BY day
+        """,
+        {"days": 6},
+        "PRIMARY",
+    ),
+    (
+        "dashboard: per-user spectrum",
+        "user_activity",
+        """
+        SELECT bias_label, COUNT(*) as post_count, COUNT(DISTINCT user_id) as unique_users
+        FROM user_activity
+        WHERE user_id = :user_id AND timestamp >= DATE_SUB(NOW(), INTERVAL :days DAY)
+        GROUP BY bias_label
+        ORDER BY post_count DESC
+        """,
+        {"user_id": "check_user", "days": 30},
+        "idx_activity_user_time",
+    ),
+    (
+        "dashboard: per-user top subreddits",
+        "user_activity",
+        """
+        SELECT subreddit, COUNT(*) as post_count, AVG(LENGTH(title)) as avg_title_length
+        FROM user_activity
+        WHERE user_id = :user_id AND timestamp >= DATE_SUB(NOW(), INTERVAL :days DAY)
+        GROUP BY subreddit
+        ORDER BY post_count DESC
+        LIMIT :limit
+        """,
+        {"user_id": "check_user", "days": 30, "limit": 5},
+        "idx_activity_user_time",
+    ),
+    (
+        "dashboard: per-user daily activity",
+        "user_activity",
+        """
+        SELECT DATE(timestamp) as day, COUNT(*) as post_count
+        FROM user_activity
+        WHERE user_id = :user_id AND timestamp >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+        GROUP BY day
+        ORDER BY day
+        """,
+        {"user_id": "check_user", "days": 6},
+        "idx_activity_user_time",
+    ),
+    (
+        "recommend: latest row for user/title",
+        "user_activity",
+        """
+        SELECT user_id, title_hash, MAX(id)
+        FROM user_activity
+        WHERE (user_id, title_hash) IN ((:user_id, UNHEX(MD5(:title))))
+        GROUP BY user_id, title_hash
+        """,
+        {"user_id": "check_user", "title": "check title"},
+        "idx_activity_user_title",
+    ),
+]
+
+
+def explain(connection, query, params):
+    result = connection.execute(text("EXPLAIN " + query), params)
+    return [dict(row._mapping) for row in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify dashboard and recommendation queries use their indexes")
+    parser.add_argument("--min-rows", type=int, default=10000,
+                        help="Row count above which the optimizer must actually choose the index")
+    args = parser.parse_args()
+
+    engine = create_engine(engine_str)
+    failures = 0
+
+    existing = set(inspect(engine).get_table_names())
+    row_counts = {}
+
+    with engine.connect() as connection:
+        for description, table, query, params, expected in QUERIES:
+            if table not in existing:
+                print(f"[SKIP] {description}: table {table} does not exist yet")
+                continue
+            if table not in row_counts:
+                row_counts[table] = connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                print(f"{table} rows: {row_counts[table]}")
+            row_count = row_counts[table]
+
+            plan = explain(connection, query, params)
+            table_plan = next((row for row in plan if row.get("table") == table), None)
+            if table_plan is None:
+                print(f"[FAIL] {description}: {table} missing from the plan")
+                failures += 1
+                continue
+            possible = (table_plan.get("possible_keys") or "").split(",")
+            chosen = table_plan.get("key")
+
+            if chosen == expected:
+                print(f"[OK]   {description}: uses {expected}")
+            elif expected not in possible:
+                print(f"[FAIL] {description}: {expected} not usable (possible_keys={possible}, key={chosen})")
+                failures += 1
+            elif row_count >= args.min_rows:
+                print(f"[FAIL] {description}: optimizer chose {chosen} instead of {expected} on {row_count} rows")
+                failures += 1
+            else:
+                print(f"[WARN] {description}: optimizer chose {chosen} (table too small to require {expected})")
+
+    if failures:
+        print(f"{failures} query plan check(s) failed")
+        sys.exit(1)
+    print("All query plans use their indexes")
+
+
+if __name__ == "__main__":
+    main()
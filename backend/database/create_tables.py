@@ -1,7 +1,11 @@
 import os
 import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, inspect, MetaData, Table
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.types import BigInteger, Float, Text
 from sqlalchemy.exc import OperationalError
 
 
@@ -32,34 +36,352 @@ else:
 
 
 # STEP 3: Load data into MySQL tables
+# SEED_MODE: "incremental" records a SHA-256 per source file in seed_files,
+# skips files that have not changed, upserts the rows of changed files keyed
+# on permalink and deletes rows no longer in their source file; "full"
+# replaces both tables on every run (IMPORT_MODE).
+# IMPORT_MODE: "streaming" reads each CSV in IMPORT_CHUNK_SIZE-row chunks and
+# bulk-loads them, loading parts of a table in parallel with IMPORT_WORKERS
+# threads; "pandas" reads whole files and writes them with a single to_sql.
+# IMPORT_METHOD (streaming only): "insert" (multi-row INSERTs) or "load_data"
+# (LOAD DATA LOCAL INFILE; the server must run with --local-infile=1).
 data_folder = "data"
+seed_mode = os.getenv("SEED_MODE", "incremental")
+import_mode = os.getenv("IMPORT_MODE", "streaming")
+import_method = os.getenv("IMPORT_METHOD", "insert")
+import_chunk_size = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+import_workers = int(os.getenv("IMPORT_WORKERS", "4"))
+
+if import_mode == "streaming" and import_method == "load_data":
+    engine = create_engine(engine_str, connect_args={"local_infile": True})
+
+
+def column_exists(connection, table, column):
+    result = connection.execute(text("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :column
+    """), {"table": table, "column": column})
+    return result.scalar() > 0
+
+
+def index_exists(connection, table, index):
+    result = connection.execute(text("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index
+    """), {"table": table, "index": index})
+    return result.scalar() > 0
+
+
+def read_header(path):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def check_headers(paths):
+    """Return the first file's columns, raising if any other file has different columns"""
+    columns = read_header(paths[0])
+    for path in paths[1:]:
+        header = read_header(path)
+        if sorted(header) != sorted(columns):
+            raise ValueError(f"{os.path.basename(path)} has columns {header}, expected {columns}")
+    return columns
+
+
+# Column kinds from narrowest to widest; a column takes the widest kind seen in any chunk
+COLUMN_KINDS = {"int": BigInteger(), "float": Float(53), "text": Text()}
+
+
+def chunk_kind(series):
+    values = series.dropna()
+    if values.empty:
+        return None
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+        return "int"
+    if pd.api.types.is_float_dtype(values):
+        # Integer columns with missing values are read as floats
+        return "int" if (values == values.round()).all() else "float"
+    return "text"
+
+
+def infer_column_types(paths):
+    """
+    Infer each column's SQL type from every chunk of every file, so a column
+    that turns non-numeric in a later chunk or part file is created as TEXT
+    instead of failing (or being truncated) partway through the import.
+    """
+    order = list(COLUMN_KINDS)
+    kinds = {}
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=import_chunk_size):
+            for column in chunk.columns:
+                kind = chunk_kind(chunk[column])
+                current = kinds.get(column)
+                if kind and (current is None or order.index(kind) > order.index(current)):
+                    kinds[column] = kind
+    return {column: COLUMN_KINDS[kinds.get(column, "text")] for column in read_header(paths[0])}
+
+
+def create_table_for_csvs(table, paths):
+    """(Re)create the table with column types inferred across all of its source CSVs"""
+    columns = check_headers(paths)
+    types = infer_column_types(paths)
+    pd.DataFrame(columns=columns).to_sql(table, con=engine, if_exists="replace", index=False, dtype=types)
+    return columns
+
+
+def insert_csv(table, path):
+    """Append the CSV to the table chunk by chunk with multi-row INSERTs"""
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=import_chunk_size):
+        chunk.to_sql(table, con=engine, if_exists="append", index=False, method="multi", chunksize=1000)
+        rows += len(chunk)
+    return rows
+
+
+def load_data_csv(table, path):
+    """Stream the CSV to MySQL with LOAD DATA LOCAL INFILE; empty fields become NULL"""
+    # Map fields by this file's own header, so part files may order columns differently
+    columns = read_header(path)
+    variables = ", ".join(f"@v{i}" for i in range(len(columns)))
+    assignments = ", ".join(f"`{c}` = NULLIF(@v{i}, '')" for i, c in enumerate(columns))
+    query = f"""
+        LOAD DATA LOCAL INFILE '{os.path.abspath(path)}'
+        INTO TABLE {table}
+        CHARACTER SET utf8mb4
+        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+        LINES TERMINATED BY '\\n'
+        IGNORE 1 LINES
+        ({variables})
+        SET {assignments}
+    """
+    with engine.begin() as connection:
+        return connection.execute(text(query)).rowcount
+
+
+def import_file(table, path):
+    start = time.perf_counter()
+    if import_method == "load_data":
+        rows = load_data_csv(table, path)
+    else:
+        rows = insert_csv(table, path)
+    elapsed = time.perf_counter() - start
+    print(f"Loaded {rows} rows from {os.path.basename(path)} → '{table}' "
+          f"in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)")
+    return rows
+
+
+def import_csvs(table, paths):
+    """Replace the table with the contents of the CSVs, loading files in parallel"""
+    start = time.perf_counter()
+    create_table_for_csvs(table, paths)
+    with ThreadPoolExecutor(max_workers=import_workers) as pool:
+        rows = sum(pool.map(lambda path: import_file(table, path), paths))
+    elapsed = time.perf_counter() - start
+    print(f"'{table}': {rows} rows from {len(paths)} file(s) in {elapsed:.1f}s "
+          f"({rows / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+# --- Incremental seeding ---
+seed_files_table_query = """
+CREATE TABLE IF NOT EXISTS seed_files (
+    file_name VARCHAR(255) PRIMARY KEY,
+    table_name VARCHAR(64),
+    content_hash CHAR(64),
+    row_count INT,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+"""
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def permalink_hash(row):
+    """16-byte MD5 of the permalink; rows without one are keyed on title and body"""
+    permalink = row.get("permalink")
+    if permalink is None:
+        permalink = f"{row.get('title') or ''}\n{row.get('body') or ''}"
+    return hashlib.md5(str(permalink).encode("utf-8")).digest()
+
+
+def ensure_upsert_table(table, paths):
+    """
+    Make sure the table has the permalink_hash unique key used for upserts and
+    the seed_file / seed_hash columns recording which load wrote each row.
+    Tables from a full seed (or an older incremental seed) are recreated, so
+    every file is reloaded. Returns True if the table was (re)created.
+    """
+    with engine.connect() as connection:
+        if inspect(engine).has_table(table) and all(
+            column_exists(connection, table, column) for column in ("permalink_hash", "seed_file", "seed_hash")
+        ):
+            return False
+
+    print(f"Creating '{table}' with a permalink_hash key")
+    create_table_for_csvs(table, paths)
+    with engine.begin() as connection:
+        connection.execute(text(f"""
+            ALTER TABLE {table}
+                ADD COLUMN permalink_hash BINARY(16) NOT NULL,
+                ADD COLUMN seed_file VARCHAR(255) NOT NULL,
+                ADD COLUMN seed_hash CHAR(64) NOT NULL
+        """))
+        connection.execute(text(f"CREATE UNIQUE INDEX idx_{table}_permalink ON {table} (permalink_hash)"))
+        connection.execute(text(f"CREATE INDEX idx_{table}_seed ON {table} (seed_file, seed_hash)"))
+    return True
+
+
+def upsert_csv(table, path, content_hash):
+    """
+    Insert new rows and update changed ones, chunk by chunk, keyed on
+    permalink_hash, then delete the rows this file loaded before that it no
+    longer contains. Rows sharing a permalink collapse into one (the last
+    one wins), unlike a full seed, which keeps every row.
+    Returns (rows upserted, rows deleted).
+    """
+    target = Table(table, MetaData(), autoload_with=engine)
+    file_name = os.path.basename(path)
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=import_chunk_size):
+        chunk = chunk[[c for c in chunk.columns if c in target.c]]
+        records = chunk.astype(object).where(pd.notna(chunk), None).to_dict("records")
+        for record in records:
+            record["permalink_hash"] = permalink_hash(record)
+            record["seed_file"] = file_name
+            record["seed_hash"] = content_hash
+
+        for i in range(0, len(records), 1000):
+            stmt = mysql_insert(target).values(records[i:i + 1000])
+            stmt = stmt.on_duplicate_key_update(
+                {c: stmt.inserted[c] for c in (*chunk.columns, "seed_file", "seed_hash")}
+            )
+            with engine.begin() as connection:
+                connection.execute(stmt)
+        rows += len(records)
+
+    # Every row still in the file now carries its new hash
+    with engine.begin() as connection:
+        deleted = connection.execute(
+            text(f"DELETE FROM {table} WHERE seed_file = :file_name AND seed_hash <> :hash"),
+            {"file_name": file_name, "hash": content_hash}
+        ).rowcount
+    return rows, deleted
+
+
+def delete_removed_files(table, paths):
+    """Delete rows (and seed_files entries) of source files that no longer exist"""
+    params = {"table": table, **{f"file{i}": os.path.basename(p) for i, p in enumerate(paths)}}
+    current = ", ".join(f":file{i}" for i in range(len(paths)))
+    with engine.begin() as connection:
+        deleted = connection.execute(
+            text(f"DELETE FROM {table} WHERE seed_file NOT IN ({current})"), params
+        ).rowcount
+        connection.execute(
+            text(f"DELETE FROM seed_files WHERE table_name = :table AND file_name NOT IN ({current})"), params
+        )
+    if deleted:
+        print(f"'{table}': deleted {deleted} rows from removed source files")
+
+
+def seed_incremental(table, paths):
+    """Upsert only the source files whose content hash differs from the last load"""
+    if not paths:
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text(seed_files_table_query))
+        loaded = dict(connection.execute(
+            text("SELECT file_name, content_hash FROM seed_files WHERE table_name = :table"),
+            {"table": table}
+        ).fetchall())
+
+    hashes = {path: file_hash(path) for path in paths}
+    recreated = ensure_upsert_table(table, paths)
+    changed = [p for p in paths if recreated or loaded.get(os.path.basename(p)) != hashes[p]]
+    if not recreated and set(loaded) - {os.path.basename(p) for p in paths}:
+        delete_removed_files(table, paths)
+
+    if not changed:
+        print(f"'{table}': {len(paths)} source file(s) unchanged, skipping")
+        return
+
+    for path in changed:
+        start = time.perf_counter()
+        rows, deleted = upsert_csv(table, path, hashes[path])
+        elapsed = time.perf_counter() - start
+        print(f"Upserted {rows} rows from {os.path.basename(path)} → '{table}' "
+              f"in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s); "
+              f"deleted {deleted} rows no longer in the file")
+
+        # Record the hash only once the file is fully loaded, so a failed run retries it
+        with engine.begin() as connection:
+            connection.execute(text("""
+                INSERT INTO seed_files (file_name, table_name, content_hash, row_count)
+                VALUES (:file_name, :table, :hash, :rows)
+                ON DUPLICATE KEY UPDATE table_name = VALUES(table_name),
+                    content_hash = VALUES(content_hash), row_count = VALUES(row_count)
+            """), {"file_name": os.path.basename(path), "table": table, "hash": hashes[path], "rows": rows})
+    print(f"'{table}': {len(changed)} of {len(paths)} source file(s) loaded")
+
 
-# --- Unlabelled data → redditposts ---
 unlabelled_file = os.path.join(data_folder, "unlabelled_data_clean.csv")
-if os.path.exists(unlabelled_file):
-    print(f"Importing {unlabelled_file} → table 'redditposts'")
-    df_unlabelled = pd.read_csv(unlabelled_file)
-    df_unlabelled.to_sql("redditposts", con=engine, if_exists="replace", index=False)
+labelled_files = [f"labelled_data_part{i}.csv" for i in range(1, 11)]
+labelled_paths = [
+    os.path.join(data_folder, file) for file in labelled_files
+    if os.path.exists(os.path.join(data_folder, file))
+]
+
+if seed_mode == "incremental":
+    if os.path.exists(unlabelled_file):
+        seed_incremental("redditposts", [unlabelled_file])
+    else:
+        print("Unlabelled data file not found!")
+
+    if labelled_paths:
+        seed_incremental("newsarticles", labelled_paths)
+    else:
+        print("No labelled CSVs found!")
+elif import_mode == "streaming":
+    # --- Unlabelled data → redditposts ---
+    if os.path.exists(unlabelled_file):
+        print(f"Importing {unlabelled_file} → table 'redditposts' ({import_method})")
+        import_csvs("redditposts", [unlabelled_file])
+    else:
+        print("Unlabelled data file not found!")
+
+    # --- Labelled data → newsarticles ---
+    if labelled_paths:
+        print(f"Importing {len(labelled_paths)} labelled CSVs → table 'newsarticles' ({import_method})")
+        import_csvs("newsarticles", labelled_paths)
+    else:
+        print("No labelled CSVs found!")
 else:
-    print("Unlabelled data file not found!")
+    # --- Unlabelled data → redditposts ---
+    if os.path.exists(unlabelled_file):
+        print(f"Importing {unlabelled_file} → table 'redditposts'")
+        df_unlabelled = pd.read_csv(unlabelled_file)
+        df_unlabelled.to_sql("redditposts", con=engine, if_exists="replace", index=False)
+    else:
+        print("Unlabelled data file not found!")
 
-# --- Labelled data → newsarticles ---
-labelled_files = [f"labelled_data_part{i}.csv" for i in range(1, 11)]
-newsarticles_df_list = []
+    # --- Labelled data → newsarticles ---
+    newsarticles_df_list = []
 
-for file in labelled_files:
-    path = os.path.join(data_folder, file)
-    if os.path.exists(path):
-        print(f"Reading {file} for newsarticles table")
+    for path in labelled_paths:
+        print(f"Reading {os.path.basename(path)} for newsarticles table")
         df = pd.read_csv(path)
         newsarticles_df_list.append(df)
 
-if newsarticles_df_list:
-    all_labelled_df = pd.concat(newsarticles_df_list, ignore_index=True)
-    print(f"Writing combined labelled data → table 'newsarticles'")
-    all_labelled_df.to_sql("newsarticles", con=engine, if_exists="replace", index=False)
-else:
-    print("No labelled CSVs found!")
+    if newsarticles_df_list:
+        all_labelled_df = pd.concat(newsarticles_df_list, ignore_index=True)
+        print(f"Writing combined labelled data → table 'newsarticles'")
+        all_labelled_df.to_sql("newsarticles", con=engine, if_exists="replace", index=False)
+    else:
+        print("No labelled CSVs found!")
 
 
 # STEP 4: Create user_activity table
@@ -85,4 +407,49 @@ with engine.connect() as connection:
     connection.commit()
 
 print("'user_activity' table ready!")
+
+
+# STEP 5: Migrate user_activity for its query patterns
+# - title_hash: MD5 of the title so long titles can be matched through a short index key
+# - (user_id, title_hash): /api/recommend looks up a user's latest row for a title
+# - (timestamp, bias_label, user_id): dashboard political spectrum (range + group + distinct users)
+# - (timestamp, subreddit): dashboard top subreddits
+# - (user_id, timestamp): per-user dashboard views
+print("Migrating 'user_activity' schema...")
+
+user_activity_indexes = {
+    "idx_activity_user_title": "(user_id, title_hash)",
+    "idx_activity_time_label": "(timestamp, bias_label, user_id)",
+    "idx_activity_time_subreddit": "(timestamp, subreddit)",
+    "idx_activity_user_time": "(user_id, timestamp)",
+}
+
+with engine.connect() as connection:
+    if not column_exists(connection, "user_activity", "title_hash"):
+        print("Adding column user_activity.title_hash")
+        connection.execute(text("ALTER TABLE user_activity ADD COLUMN title_hash BINARY(16) NULL AFTER title"))
+        connection.commit()
+
+    # Backfill in batches so large tables don't hold one giant transaction
+    backfilled = 0
+    while True:
+        result = connection.execute(text("""
+            UPDATE user_activity SET title_hash = UNHEX(MD5(title))
+            WHERE title_hash IS NULL AND title IS NOT NULL
+            LIMIT 10000
+        """))
+        connection.commit()
+        backfilled += result.rowcount
+        if result.rowcount == 0:
+            break
+    if backfilled:
+        print(f"Backfilled title_hash for {backfilled} rows")
+
+    for index_name, columns in user_activity_indexes.items():
+        if not index_exists(connection, "user_activity", index_name):
+            print(f"Creating index {index_name} {columns}")
+            connection.execute(text(f"CREATE INDEX {index_name} ON user_activity {columns}"))
+            connection.commit()
+
+print("'user_activity' indexes ready!")
 print("All CSV files imported and tables created successfully!")
@@ -115,8 +115,11 @@ if (!window.location.hostname.includes('reddit.com')) {
         
         document.body.appendChild(btnCon)
         const button = btnCon.querySelector('button')
-        button.addEventListener('click',() => {
-          window.open(`http://127.0.0.1:${availPort}`, "_blank");
+        button.addEventListener('click', async () => {
+          // The dashboard shows this user's activity when given their username
+          const username = await getRedditUsername();
+          const query = username ? `?user_id=${encodeURIComponent(username)}` : "";
+          window.open(`http://127.0.0.1:${availPort}${query}`, "_blank");
         });
       })
   }
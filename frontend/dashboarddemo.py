@@ -3,10 +3,11 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import os
+import requests
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import OperationalError
 
 # Load environment variables from .env file
 load_dotenv()
@@ -29,82 +30,62 @@ def count_to_time_display(post_count):
     return f"{hours}h {minutes}m"
 
 
-# Connecting dashboard to database
-@st.cache_resource(ttl=300)
-def get_db_connection():
-    """Create SQLAlchemy engine for pandas compatibility"""
+# The dashboard reads its aggregates from the API's /api/stats/* endpoints,
+# which cache them server-side and version them with an ETag.
+API_URL = os.getenv("API_URL", "http://api:8000")
+
+# Per-user views: the extension opens the dashboard with ?user_id=<reddit username>.
+user_id = st.query_params.get("user_id") or None
+screentime_days = 7
+
+
+@st.cache_resource
+def get_stats_client():
+    """
+    Keep-alive HTTP session and the last (ETag, rows) seen per stats request.
+    Shared by every session's script thread, so the response LRU has a lock.
+    """
+    return requests.Session(), OrderedDict(), threading.Lock()
+
+
+def fetch_stats(path, **params):
+    """GET a stats endpoint as a DataFrame, revalidating the previous response with If-None-Match"""
+    session, responses, lock = get_stats_client()
+    params = {name: value for name, value in params.items() if value is not None}
+    key = (path, tuple(sorted(params.items())))
+    with lock:
+        previous = responses.get(key)
+    headers = {"If-None-Match": previous[0]} if previous else {}
+
     try:
-        engine_str = f"mysql+pymysql://{os.getenv('DB_USER', 'root')}:{os.getenv('DB_PASSWORD', 'root')}@{os.getenv('DB_HOST', 'database')}:{os.getenv('DB_PORT', '3306')}/{os.getenv('DB_NAME', 'mydatabase')}"
-        engine = create_engine(engine_str)
-        
-        # Test connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        
-        return engine
-    except Exception as e:
-        st.error(f"Database connection failed: {e}")
+        response = session.get(f"{API_URL}{path}", params=params, headers=headers, timeout=10)
+        if response.status_code == 304 and previous:
+            return pd.DataFrame(previous[1])
+        response.raise_for_status()
+        data = response.json()
+    except requests.RequestException as e:
+        st.error(f"Error fetching {path}: {e}")
         return None
 
+    with lock:
+        responses[key] = (response.headers.get("ETag"), data)
+        responses.move_to_end(key)
+        if len(responses) > 1000:
+            responses.popitem(last=False)
+    return pd.DataFrame(data)
+
+
 # Political spectrum data
-@st.cache_data(ttl=60)
-def get_political_spectrum_data():
-    engine = get_db_connection()
-    if engine is None:
-        return None
-    
-    try:
-        query = """
-        SELECT 
-            bias_label,
-            COUNT(*) as post_count,
-            COUNT(DISTINCT user_id) as unique_users
-        FROM user_activity 
-        WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s DAY)
-        GROUP BY bias_label
-        ORDER BY post_count DESC
-        """
-        
-        df = pd.read_sql(query, engine, params=(days_back,))
-        return df
-    except Exception as e:
-        st.error(f"Error fetching political data: {e}")
-        return None
+def get_political_spectrum_data(user_id=None):
+    return fetch_stats("/api/stats/spectrum", user_id=user_id, days=days_back)
 
-# Top subreddit data           
-@st.cache_data(ttl=60)
-def get_top_categories_data():
-    engine = get_db_connection()
-    if engine is None:
-        return None
-    
-    try:
-        query = """
-        SELECT 
-            subreddit,
-            COUNT(*) as post_count,
-            AVG(LENGTH(title)) as avg_title_length
-        FROM user_activity 
-        WHERE timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        GROUP BY subreddit
-        ORDER BY post_count DESC
-        LIMIT 5
-        """
-        
-        df = pd.read_sql(query, engine)
-        return df
-    except Exception as e:
-        st.error(f"Error fetching categories data: {e}")
-        return None
+# Top subreddit data
+def get_top_categories_data(user_id=None):
+    return fetch_stats("/api/stats/subreddits", user_id=user_id, days=days_back, limit=5)
 
-# Static screentime data
-def get_static_screentime_data():
-    return {
-        'modes': ['Skeptical Mode', 'Vibes Mode'],
-        'hours': [4.22, 6.5],
-        'time_display': ['4h 13m', '6h 30m'],
-        'total_display': '10h 43m'
-    }
+# Screentime data: posts viewed per day, converted with count_to_time_display
+def get_screentime_data(user_id=None):
+    return fetch_stats("/api/stats/screentime", user_id=user_id, days=screentime_days)
 
 # Enhanced CSS for Reddit integration - COMPLETELY REMOVES TOP WHITE BAR
 st.markdown("""
@@ -298,7 +279,7 @@ with col1:
     st.markdown('<div class="card-header">Political Spectrum Distribution</div>', unsafe_allow_html=True)
     
     # Get live data from user_activity table
-    political_data = get_political_spectrum_data()
+    political_data = get_political_spectrum_data(user_id)
     
     if political_data is not None and not political_data.empty:
         spectrum = []
@@ -350,51 +331,57 @@ with col2:
     # Screentime Analysis Card
     st.markdown('<div class="card-header">Screentime Analysis</div>', unsafe_allow_html=True)
     
-    # Mode Breakdown Donut Chart
-    modes = ['Skeptical', 'Vibes']
-    hours = [4.22, 6.5]
-    time_display = ['4h 13m', '6h 30m']  # Formatted display
-    
-    fig_modes = go.Figure(data=[go.Pie(
-        labels=modes,
-        values=hours,
-        textinfo='label+value',  # Show label + actual hours value
-        texttemplate='%{label}<br>%{value:.1f}h',  # Custom format: label + hours
-        textposition='inside',
-        hovertemplate='<b>%{label}</b><br>Time: %{customdata}<extra></extra>',
-        customdata=time_display,
-        marker=dict(
-            colors=['#4CAF50', '#dc3545'], 
-            line=dict(color='white', width=2)
-        ),
-        hole=0.5,
-        textfont=dict(size=11, family='Inter')
+    # Estimated time per day over the last week, from posts viewed
+    screentime_data = get_screentime_data(user_id)
+    
+    today = datetime.now().date()
+    days = [today - timedelta(days=i) for i in range(screentime_days - 1, -1, -1)]
+    counts_by_day = {}
+    if screentime_data is not None and not screentime_data.empty:
+        counts_by_day = {
+            pd.Timestamp(row['day']).date(): int(row['post_count'])
+            for _, row in screentime_data.iterrows()
+        }
+    
+    day_labels = [day.strftime('%a') for day in days]
+    day_counts = [counts_by_day.get(day, 0) for day in days]
+    hours = [count * 2 / 60 for count in day_counts]
+    time_display = [count_to_time_display(count) for count in day_counts]
+    total_display = count_to_time_display(sum(day_counts))
+    
+    fig_modes = go.Figure(data=[go.Bar(
+        x=day_labels,
+        y=hours,
+        marker_color='#4CAF50',
+        text=time_display,
+        textposition='auto',
+        hovertemplate='<b>%{x}</b><br>Time: %{text}<extra></extra>'
     )])
     
     fig_modes.update_layout(
         height=300,
         showlegend=False,
-        margin=dict(l=20, r=20, t=20, b=20),
+        margin=dict(l=20, r=20, t=40, b=20),
         font=dict(family='Inter, sans-serif', size=11),
+        yaxis_title="Hours",
         paper_bgcolor='white',
         plot_bgcolor='white',
+        yaxis=dict(
+            gridcolor='#f1f5f9',
+            showgrid=True
+        ),
         annotations=[
             dict(
-                text='10h 43m',
-                x=0.5, y=0.5,
-                font=dict(size=20, color='#111827', family='Inter', weight=700),
-                showarrow=False
-            ),
-            dict(
-                text='Total Screentime',
-                x=0.5, y=0.42,
-                font=dict(size=12, color='#6b7280', family='Inter', weight=500),
+                text=f'{total_display} total screentime',
+                x=0.5, y=1.12,
+                xref='paper', yref='paper',
+                font=dict(size=14, color='#111827', family='Inter', weight=700),
                 showarrow=False
             )
         ]
     )
     
-    st.plotly_chart(fig_modes, use_container_width=True, key="mode_breakdown_pie")
+    st.plotly_chart(fig_modes, use_container_width=True, key="screentime_bar")
     st.markdown('<div class="card-header"></div>', unsafe_allow_html=True)
 
 with col3:
@@ -402,7 +389,7 @@ with col3:
     st.markdown('<div class="card-header">Top Subreddits Engagement</div>', unsafe_allow_html=True)
     
     # Get categories data from database
-    categories_data = get_top_categories_data()
+    categories_data = get_top_categories_data(user_id)
     
     if categories_data is not None and not categories_data.empty:
         y_data = [f"{row['subreddit'].title()}" for _, row in categories_data.iterrows()]